@@ -0,0 +1,119 @@
+"""Бенчмарк ask_groq против локального заменителя API Groq.
+
+Сравнивает прежнюю реализацию (requests.post в asyncio.to_thread, новое
+соединение на каждый вызов) с текущей на общем пуле httpx.
+
+    pip install requests  # только для прежней реализации
+    python -m bench.bench_groq [запросов] [параллельно] [задержка ответа, мс]
+
+Заменитель работает по HTTP, поэтому экономия на TLS-рукопожатиях
+реального API сюда не входит.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import multiprocessing
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_DELAY = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else 0.1
+_REPLY = json.dumps(
+    {"choices": [{"message": {"role": "assistant", "content": "ok"}}]}
+).encode()
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(_DELAY)  # имитация работы модели
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_REPLY)))
+        self.end_headers()
+        self.wfile.write(_REPLY)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    request_queue_size = 128
+
+
+def _serve_forever(conn) -> None:
+    server = _Server(("127.0.0.1", 0), _StandIn)
+    conn.send(server.server_address[1])
+    server.serve_forever()
+
+
+def _serve() -> tuple[str, multiprocessing.Process]:
+    # отдельный процесс: потоки сервера не делят GIL с измеряемым клиентом
+    parent, child = multiprocessing.Pipe()
+    proc = multiprocessing.Process(target=_serve_forever, args=(child,), daemon=True)
+    proc.start()
+    return f"http://127.0.0.1:{parent.recv()}", proc
+
+
+async def _legacy_ask(base: str) -> str:
+    import requests
+
+    resp = await asyncio.to_thread(
+        requests.post,
+        f"{base}/chat/completions",
+        headers={"Authorization": "Bearer x"},
+        json={"model": "m", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 8},
+        timeout=30,
+    )
+    resp.raise_for_status()
+    return resp.json()["choices"][0]["message"]["content"]
+
+
+async def _run(call, total: int, parallel: int) -> float:
+    sem = asyncio.Semaphore(parallel)
+
+    async def _one():
+        async with sem:
+            assert await call() == "ok"
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_one() for _ in range(total)))
+    return time.perf_counter() - t0
+
+
+async def main() -> None:
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    parallel = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    base, server = _serve()
+    os.environ["GROQ_BASE_URL"] = base
+
+    from src.clients import gpt
+
+    async def _new():
+        return await gpt.ask_groq(
+            api_token="x",
+            model="m",
+            messages=[{"role": "user", "content": "hi"}],
+            max_tokens=8,
+            system="s",
+        )
+
+    await gpt.init()
+    try:
+        t_legacy = await _run(lambda: _legacy_ask(base), total, parallel)
+        t_new = await _run(_new, total, parallel)
+    finally:
+        await gpt.aclose()
+        server.terminate()
+    print(f"requests={total} parallel={parallel} delay={_DELAY * 1000:.0f}ms")
+    print(f"legacy (requests+to_thread): {t_legacy / total * 1000:.2f} ms/req")
+    print(f"pooled httpx:                {t_new / total * 1000:.2f} ms/req")
+    print(f"speedup: x{t_legacy / t_new:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
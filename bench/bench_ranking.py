@@ -0,0 +1,134 @@
+"""Микробенчмарк ранжирования кандидатов /add.
+
+Сравнивает прежнюю схему (score_candidates с _has_part внутри цикла плюс
+повторная нормализация в add.py) с ranking.score_batch.
+
+    python -m bench.bench_ranking [кол-во кандидатов] [повторы]
+"""
+
+import random
+import re
+import sys
+import timeit
+from dataclasses import replace
+
+import roman
+
+from src.clients.tmdb import Candidate
+from src.domain.movies import ranking
+
+_WORDS = ["star", "wars", "return", "empire", "night", "dark", "king", "ring", "война", "звёзд"]
+_PARTS = ["", " Part 2", " Chapter III", " Volume 4", " II", " 7"]
+
+
+def _legacy_score(cands, user_year, part_hint, query):
+    def _has_part(title, part):
+        title_lower = title.lower()
+        arabic = str(part)
+        romans = ["i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x"]
+        roman_num = romans[part - 1] if 0 < part <= len(romans) else ""
+        patterns = [
+            arabic, roman_num,
+            f"part {arabic}", f"part {roman_num}",
+            f"chapter {arabic}", f"chapter {roman_num}",
+            f"volume {arabic}", f"volume {roman_num}",
+        ]
+        return any(p in title_lower for p in patterns if p)
+
+    for cand in cands:
+        score = cand.popularity
+        if user_year and cand.release_year == user_year:
+            score *= 1.1
+        if part_hint and (
+            _has_part(cand.title_localized, part_hint) or _has_part(cand.original_title, part_hint)
+        ):
+            score *= 1.2
+        if query and (
+            cand.title_localized.lower() == query.lower()
+            or cand.original_title.lower() == query.lower()
+        ):
+            score *= 1.1
+        cand.score = score
+    cands.sort(key=lambda c: c.score, reverse=True)
+    return cands
+
+
+def _legacy_extract_part(title):
+    pattern = r"(?i)(?:part|chapter|volume|season|сезон|фильм|film)\s*([ivxlcdm]+|\d+)\b"
+    m = re.search(pattern, title)
+    if not m:
+        return None
+    token = m.group(1)
+    if token.isdigit():
+        return int(token)
+    try:
+        return roman.fromRoman(token.upper())
+    except roman.InvalidRomanNumeralError:
+        return None
+
+
+def _legacy_norm(title):
+    text = title.lower().replace("-", " ")
+    text = re.sub(r'["\'«»“”„]', "", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    tokens = text.split()
+    if len(tokens) >= 2 and tokens[-2] in ranking.PART_KEYWORDS:
+        last = tokens[-1]
+        if last.isdigit():
+            tokens = tokens[:-2]
+        else:
+            try:
+                roman.fromRoman(last.upper())
+                tokens = tokens[:-2]
+            except roman.InvalidRomanNumeralError:
+                pass
+    return " ".join(tokens)
+
+
+def _legacy(cands, user_year, part_hint, query):
+    cands = _legacy_score(cands, user_year, part_hint, query)
+    for c in cands:
+        c.part_num = _legacy_extract_part(c.title_localized) or _legacy_extract_part(c.original_title)
+        c.norm_local = _legacy_norm(c.title_localized)
+        c.norm_orig = _legacy_norm(c.original_title)
+    return cands
+
+
+def _make(n, seed=1):
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        title = " ".join(rnd.choice(_WORDS) for _ in range(rnd.randint(1, 4))) + rnd.choice(_PARTS)
+        out.append(
+            Candidate(
+                tmdb_id=i,
+                title_localized=title,
+                original_title=title.upper(),
+                release_year=rnd.randint(1970, 2025),
+                popularity=rnd.random() * 100,
+                media_type="movie",
+            )
+        )
+    return out
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    base = _make(n)
+    args = (2001, 2, "star wars")
+
+    legacy = _legacy([replace(c) for c in base], *args)
+    new = ranking.score_batch([replace(c) for c in base], *args)
+    assert [c.tmdb_id for c in legacy] == [c.tmdb_id for c in new], "rankings differ"
+
+    t_legacy = timeit.timeit(lambda: _legacy([replace(c) for c in base], *args), number=repeat)
+    t_new = timeit.timeit(lambda: ranking.score_batch([replace(c) for c in base], *args), number=repeat)
+    print(f"candidates={n} repeat={repeat}")
+    print(f"legacy:     {t_legacy / repeat * 1000:.2f} ms/batch")
+    print(f"score_batch {t_new / repeat * 1000:.2f} ms/batch")
+    print(f"speedup:    x{t_legacy / t_new:.2f}")
+
+
+if __name__ == "__main__":
+    main()
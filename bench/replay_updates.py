@@ -0,0 +1,61 @@
+"""Отправка записанных апдейтов Telegram на локальный вебхук.
+
+Файл — JSON с одним апдейтом, JSON-массив или JSONL (по апдейту в строке).
+Секрет берётся из ``WEBHOOK_SECRET``, адрес — первый аргумент.
+
+    python -m bench.replay_updates http://localhost:8080/telegram updates.jsonl [параллельно]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+import httpx
+
+
+def _load(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as fh:
+        text = fh.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    try:
+        return [json.loads(text)]
+    except ValueError:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+async def main() -> None:
+    url, path = sys.argv[1], sys.argv[2]
+    parallel = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+    updates = _load(path)
+    headers = {"X-Telegram-Bot-Api-Secret-Token": os.getenv("WEBHOOK_SECRET", "")}
+    statuses: Counter[int] = Counter()
+    latencies: list[float] = []
+    sem = asyncio.Semaphore(parallel)
+
+    async with httpx.AsyncClient(timeout=10) as client:
+
+        async def post(update: dict) -> None:
+            async with sem:
+                t0 = time.perf_counter()
+                r = await client.post(url, json=update, headers=headers)
+                latencies.append(time.perf_counter() - t0)
+                statuses[r.status_code] += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(post(u) for u in updates))
+        total = time.perf_counter() - t0
+
+    latencies.sort()
+    print(f"updates={len(updates)} parallel={parallel} total={total:.2f}s")
+    print("statuses:", dict(statuses))
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+        print(f"latency p50={latencies[len(latencies) // 2] * 1000:.1f}ms p95={p95 * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
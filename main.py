@@ -3,11 +3,14 @@ import logging
 import uuid
 import tracemalloc
 from importlib import import_module
+from urllib.parse import urlparse
 
+from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler
 
 from src.core.config import config
 from src.handlers.gpt import gpt_handler, id_handler, start_handler
+from src.handlers.gpt_settings import gptset_handler
 from src.handlers.add import add_handler
 from src.handlers.add_callback import add_callback_handler
 from src.handlers.list import list_handler
@@ -16,6 +19,11 @@ from src.handlers.done import done_handler
 from src.handlers.insta import link_handler, insta_handler
 from src.handlers.insta_unfurl import insta_unfurl_handler
 from src.core import db
+from src.clients import gpt
+from src.services import llm, stats, summarizer
+from src.services.chat_queue import chat_queue
+from src.services.dialog_store import dialog_store
+from src.services.update_processor import update_processor
 del_handler = import_module("src.handlers.del").del_handler
 from src.clients.tmdb import TMDbAuthError, TMDbError, tmdb_client
 from src.utils.text import mask
@@ -67,12 +75,43 @@ async def on_error(update, context):
         pass
 
 
+async def _prune_tmdb_cache(context) -> None:
+    try:
+        deleted = await tmdb_client.prune_cache()
+        if deleted:
+            logging.info("tmdb cache pruned: %d rows", deleted)
+    except Exception as e:
+        logging.warning("tmdb cache prune failed: %s", e)
+
+
+def _run_webhook(app: Application) -> None:
+    """Serve updates on PORT; Telegram POSTs them to WEBHOOK_URL."""
+    if not config.WEBHOOK_URL or not config.WEBHOOK_SECRET:
+        raise SystemExit("USE_WEBHOOK=true требует WEBHOOK_URL и WEBHOOK_SECRET")
+    url_path = urlparse(config.WEBHOOK_URL).path.strip("/")
+    logging.info("webhook listen=0.0.0.0:%s path=/%s", config.PORT, url_path)
+    # Встроенный сервер PTB сверяет X-Telegram-Bot-Api-Secret-Token, кладёт апдейт
+    # в очередь и сразу отвечает 200. Выбор в /add и история диалогов живут в памяти
+    # процесса, поэтому несколько экземпляров — только с липкой маршрутизацией по чату.
+    app.run_webhook(
+        listen="0.0.0.0",
+        port=config.PORT,
+        url_path=url_path,
+        webhook_url=config.WEBHOOK_URL,
+        secret_token=config.WEBHOOK_SECRET,
+        allowed_updates=Update.ALL_TYPES,
+        drop_pending_updates=config.WEBHOOK_DROP_PENDING,
+        max_connections=config.WEBHOOK_MAX_CONNECTIONS,
+    )
+
+
 def main() -> None:
     _make_logger()
     if config.MEM_DEBUG:
         tracemalloc.start()
     async def on_startup(app):
         await db.init()
+        await gpt.init()
         try:
             await tmdb_client.check_key()
         except TMDbAuthError:
@@ -88,8 +127,22 @@ def main() -> None:
         )
 
     async def on_shutdown(app):
+        stats.log_snapshot()
         db_status = "ok"
         tmdb_status = "ok"
+        gpt_status = "ok"
+        try:
+            await chat_queue.aclose()
+        except Exception as e:
+            logging.error("Shutdown: closing chat queue failed: %s", e)
+        try:
+            await summarizer.aclose()
+        except Exception as e:
+            logging.error("Shutdown: stopping summarizer failed: %s", e)
+        try:
+            await dialog_store.flush()
+        except Exception as e:
+            logging.error("Shutdown: flushing dialogs failed: %s", e)
         try:
             await db.close()
         except Exception as e:
@@ -100,8 +153,16 @@ def main() -> None:
         except Exception as e:
             logging.error("Shutdown: closing TMDb failed: %s", e)
             tmdb_status = "error"
+        try:
+            await gpt.aclose()
+        except Exception as e:
+            logging.error("Shutdown: closing GPT failed: %s", e)
+            gpt_status = "error"
         logging.info(
-            "Shutdown: closing DB... %s; closing TMDb... %s", db_status, tmdb_status
+            "Shutdown: closing DB... %s; closing TMDb... %s; closing GPT... %s",
+            db_status,
+            tmdb_status,
+            gpt_status,
         )
 
     app = (
@@ -109,13 +170,30 @@ def main() -> None:
         .token(config.TELEGRAM_TOKEN)
         .post_init(on_startup)
         .post_stop(on_shutdown)
+        .concurrent_updates(update_processor)
         .build()
     )
     app.job_queue.scheduler
     logging.info("JobQueue=ok")
+    stats.register("tmdb", tmdb_client.stats)
+    stats.register("llm", llm.stats)
+    stats.register("chat_queue", chat_queue.stats)
+    stats.register("dialogs", dialog_store.stats)
+    stats.register("summarizer", summarizer.stats)
+    stats.register("updates", update_processor.stats)
+    stats.schedule(app.job_queue)
+    dialog_store.schedule(app.job_queue)
+    if config.TMDB_PERSISTENT_CACHE and config.TMDB_CACHE_PRUNE_INTERVAL > 0:
+        app.job_queue.run_repeating(
+            _prune_tmdb_cache,
+            interval=config.TMDB_CACHE_PRUNE_INTERVAL,
+            first=60,
+            name="prune_tmdb_cache",
+        )
 
     app.add_handler(CommandHandler("start", start_handler))
     app.add_handler(CommandHandler("id", id_handler))
+    app.add_handler(CommandHandler("gptset", gptset_handler))
     app.add_handler(CommandHandler("add", add_handler))
     app.add_handler(CommandHandler("list", list_handler))
     app.add_handler(CommandHandler("done", done_handler))
@@ -129,9 +207,17 @@ def main() -> None:
 
     app.add_error_handler(on_error)
 
-    logging.info("config ok: webhook=False require_prefix=%s", config.REQUIRE_PREFIX)
-    logging.info("polling")
-    app.run_polling(drop_pending_updates=True)
+    logging.info(
+        "config ok: webhook=%s require_prefix=%s update_concurrency=%s",
+        config.USE_WEBHOOK,
+        config.REQUIRE_PREFIX,
+        update_processor.limit,
+    )
+    if config.USE_WEBHOOK:
+        _run_webhook(app)
+    else:
+        logging.info("polling")
+        app.run_polling(drop_pending_updates=True)
 
 
 if __name__ == "__main__":
@@ -1,80 +1,231 @@
 import asyncio
+import json
 import logging
-import os
+import time
+from typing import AsyncIterator, Optional
 
-import requests
-from openai import OpenAI
+import httpx
+import openai
+from openai import AsyncOpenAI
 
 from src.core.config import config
+from src.utils.retry import Retry, RetryPolicy
 from src.utils.text import mask
 
-_client: OpenAI | None = None
+_client: AsyncOpenAI | None = None
 _client_token: str | None = None
+# модели, не поддерживающие responses API: сразу идём в chat.completions
+_chat_only_models: set[str] = set()
+# коды 400, означающие, что модель не работает через responses (а не ошибку в запросе)
+_UNSUPPORTED_CODES = frozenset({"model_not_found", "unsupported_model"})
+# меньше этого остатка попытки запасной chat-запрос не начинаем, сек
+_FALLBACK_MIN_SECONDS = 1.0
+# общий пул соединений для HTTP-запросов к провайдерам (keep-alive между вызовами)
+_http: httpx.AsyncClient | None = None
+# провайдер -> счётчики токенов промпта из usage, в том числе попавших в кэш провайдера
+_usage: dict[str, dict[str, int]] = {}
 
 
-def _get_client(api_token: str) -> OpenAI:
+def _chat_messages(system: str, messages: list[dict]) -> list[dict]:
+    # системный промпт всегда первым и неизменным — это общий префикс для кэша провайдера
+    return [{"role": "system", "content": system}, *messages]
+
+
+def _field(obj, name: str):
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+def _record_usage(provider: str, usage, prompt_field: str, details_field: str) -> None:
+    """Count prompt and cached tokens from a response ``usage`` object or dict."""
+    prompt_tokens = _field(usage, prompt_field)
+    if prompt_tokens is None:
+        return
+    cached = _field(_field(usage, details_field), "cached_tokens") or 0
+    counters = _usage.setdefault(
+        provider, {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0}
+    )
+    counters["requests"] += 1
+    counters["prompt_tokens"] += int(prompt_tokens)
+    counters["cached_tokens"] += int(cached)
+
+
+def usage_stats() -> dict:
+    return {
+        provider: {
+            **c,
+            "cached_ratio": round(c["cached_tokens"] / c["prompt_tokens"], 3)
+            if c["prompt_tokens"]
+            else 0.0,
+        }
+        for provider, c in _usage.items()
+    }
+
+
+def _get_http() -> httpx.AsyncClient:
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.GPT_POOL_SIZE,
+                max_keepalive_connections=config.GPT_POOL_SIZE,
+                keepalive_expiry=config.GPT_KEEPALIVE_EXPIRY,
+            ),
+            timeout=config.GPT_HTTP_TIMEOUT,
+        )
+    return _http
+
+
+async def init() -> None:
+    """Create the shared HTTP pool at startup."""
+    _get_http()
+
+
+async def aclose() -> None:
+    global _http, _client
+    _client = None  # клиент OpenAI работает поверх _http, закрывать его отдельно не нужно
+    if _http is not None:
+        await _http.aclose()
+        _http = None
+
+
+def _get_client(api_token: str) -> AsyncOpenAI:
     global _client, _client_token
     if _client is None or _client_token != api_token:
-        os.environ["OPENAI_API_KEY"] = api_token
-        _client = OpenAI()
+        _client = AsyncOpenAI(
+            api_key=api_token,
+            http_client=_get_http(),
+            timeout=config.GPT_HTTP_TIMEOUT,
+            max_retries=0,  # повторы делает ask_openai
+        )
         _client_token = api_token
     return _client
 
 
+class EmptyAnswer(Exception):
+    """The provider replied without any text."""
+
+
+def _classify_openai(e: BaseException) -> Optional[Retry]:
+    if isinstance(e, (openai.APITimeoutError, openai.APIConnectionError, TimeoutError)):
+        logging.warning("[openai] timeout/network %s", mask(repr(e)))
+        return Retry()
+    if isinstance(e, (openai.RateLimitError, openai.InternalServerError, EmptyAnswer)):
+        logging.warning("[openai] retryable %s", mask(repr(e)))
+        return Retry()
+    logging.error("[openai] chat error %s", mask(repr(e)))
+    return None
+
+
+def _classify_groq(e: BaseException) -> Optional[Retry]:
+    if isinstance(e, httpx.HTTPStatusError):
+        status = e.response.status_code
+        if status == 429 or status >= 500:
+            logging.warning("[groq] http %s", status)
+            return Retry()
+        logging.error("[groq] http %s %s", status, mask(e.response.text[:200]))
+        return None
+    if isinstance(e, (httpx.TransportError, TimeoutError, EmptyAnswer)):
+        logging.warning("[groq] retryable %s", mask(repr(e)))
+        return Retry()
+    logging.error("[groq] error %s", mask(repr(e)))
+    return None
+
+
+_openai_retry = RetryPolicy(
+    "openai",
+    attempts=config.GPT_MAX_RETRIES,
+    base_delay=config.GPT_RETRY_BACKOFF_BASE,
+    max_delay=config.GPT_RETRY_BACKOFF_MAX,
+    classify=_classify_openai,
+)
+_groq_retry = RetryPolicy(
+    "groq",
+    attempts=config.GPT_MAX_RETRIES,
+    base_delay=config.GPT_RETRY_BACKOFF_BASE,
+    max_delay=config.GPT_RETRY_BACKOFF_MAX,
+    classify=_classify_groq,
+)
+
+
+def retry_stats() -> dict:
+    return {"openai": _openai_retry.stats(), "groq": _groq_retry.stats()}
+
+
+def _model_unsupported(e: openai.APIStatusError) -> bool:
+    """True if Responses rejected the model itself, not this particular request."""
+    if isinstance(e, openai.NotFoundError):
+        return True
+    if getattr(e, "code", None) in _UNSUPPORTED_CODES:
+        return True
+    message = str(e).lower()
+    return "model" in message and "not supported" in message
+
+
 async def ask_openai(
     *,
     api_token: str,
     model: str,
-    prompt: str,
+    messages: list[dict],
     max_tokens: int,
     system: str,
     timeout: int | None = None,
 ) -> str:
-    timeout = timeout or config.GPT_HTTP_TIMEOUT
-    async def _request() -> str:
-        for attempt in range(config.GPT_MAX_RETRIES):
-            client = _get_client(api_token)
-            text = ""
+    async def _attempt(budget: float) -> str:
+        deadline = time.monotonic() + budget
+        client = _get_client(api_token)
+        unsupported = False
+        if model not in _chat_only_models:
             try:
-                resp = await asyncio.to_thread(
-                    client.responses.create,
+                # вся попытка: медленный, но успешный ответ не обрываем (токены уже оплачены)
+                resp = await client.responses.create(
                     model=model,
-                    input=prompt,
+                    input=messages,
                     instructions=system,
                     max_output_tokens=max_tokens,
+                    timeout=budget,
+                )
+            except (openai.BadRequestError, openai.NotFoundError) as e:
+                # быстрый отказ — пробуем chat в той же попытке; таймауты и сеть решает RetryPolicy
+                logging.warning("[openai] responses rejected %s", mask(str(e)))
+                unsupported = _model_unsupported(e)
+            else:
+                _record_usage(
+                    "openai", resp.usage, "input_tokens", "input_tokens_details"
                 )
                 text = getattr(resp, "output_text", "") or ""
                 if not text:
                     text = resp.output[0].content[0].text
-            except Exception as e:
-                logging.warning("[openai] responses error %s", mask(str(e)))
-            if not text:
-                try:
-                    resp = await asyncio.to_thread(
-                        client.chat.completions.create,
-                        model=model,
-                        messages=[
-                            {"role": "system", "content": system},
-                            {"role": "user", "content": prompt},
-                        ],
-                        max_tokens=max_tokens,
-                    )
-                    text = resp.choices[0].message.content
-                except Exception as e:
-                    logging.error("[openai] chat error %s", mask(str(e)))
-                    text = ""
-            if text:
+                if not text:
+                    raise EmptyAnswer
                 return text
-            if attempt < config.GPT_MAX_RETRIES - 1:
-                await asyncio.sleep(
-                    config.GPT_RETRY_BACKOFF_BASE * (2 ** attempt)
-                )
-        return ""
+        remaining = deadline - time.monotonic()
+        if remaining < _FALLBACK_MIN_SECONDS:
+            # chat-запрос не успеет — пусть решает политика повторов
+            raise asyncio.TimeoutError("openai: no time left for chat fallback")
+        resp = await client.chat.completions.create(
+            model=model,
+            messages=_chat_messages(system, messages),
+            max_tokens=max_tokens,
+            timeout=remaining,
+        )
+        text = resp.choices[0].message.content
+        _record_usage("openai", resp.usage, "prompt_tokens", "prompt_tokens_details")
+        if not text:
+            raise EmptyAnswer
+        if unsupported:
+            # модель не поддерживает responses — запоминаем, чтобы не тратить запрос
+            logging.info("[openai] model %s marked chat-only", model)
+            _chat_only_models.add(model)
+        return text
 
     try:
-        return await asyncio.wait_for(_request(), timeout)
+        return await _openai_retry.run(_attempt, timeout or config.GPT_HTTP_TIMEOUT)
     except Exception as e:
-        logging.error("[openai] timeout %s", mask(str(e)))
+        logging.error("[openai] failed %s", mask(repr(e)))
         return ""
 
 
@@ -82,49 +233,111 @@ async def ask_groq(
     *,
     api_token: str,
     model: str,
-    prompt: str,
+    messages: list[dict],
     max_tokens: int,
     system: str,
     timeout: int | None = None,
 ) -> str:
-    timeout = timeout or config.GPT_HTTP_TIMEOUT
-    url = "https://api.groq.com/openai/v1/chat/completions"
+    url = f"{config.GROQ_BASE_URL.rstrip('/')}/chat/completions"
 
-    async def _request() -> str:
-        for attempt in range(config.GPT_MAX_RETRIES):
-            try:
-                resp = await asyncio.to_thread(
-                    requests.post,
-                    url,
-                    headers={"Authorization": f"Bearer {api_token}"},
-                    json={
-                        "model": model,
-                        "messages": [
-                            {"role": "system", "content": system},
-                            {"role": "user", "content": prompt},
-                        ],
-                        "max_tokens": max_tokens,
-                    },
-                    timeout=timeout,
-                )
-                resp.raise_for_status()
-                data = resp.json()
-                choice = data.get("choices", [{}])[0]
-                content = choice.get("message", {}).get("content")
-                if not content:
-                    content = choice.get("delta", {}).get("content", "")
-                return content or ""
-            except Exception as e:
-                logging.error("[groq] error %s", mask(str(e)))
-                if attempt < config.GPT_MAX_RETRIES - 1:
-                    await asyncio.sleep(
-                        config.GPT_RETRY_BACKOFF_BASE * (2 ** attempt)
-                    )
-        return ""
+    async def _attempt(budget: float) -> str:
+        resp = await _get_http().post(
+            url,
+            headers={"Authorization": f"Bearer {api_token}"},
+            json={
+                "model": model,
+                "messages": _chat_messages(system, messages),
+                "max_tokens": max_tokens,
+            },
+            timeout=budget,
+        )
+        resp.raise_for_status()
+        data = resp.json()
+        _record_usage(
+            "groq", data.get("usage"), "prompt_tokens", "prompt_tokens_details"
+        )
+        choice = data.get("choices", [{}])[0]
+        content = choice.get("message", {}).get("content")
+        if not content:
+            content = choice.get("delta", {}).get("content", "")
+        if not content:
+            raise EmptyAnswer
+        return content
 
     try:
-        return await asyncio.wait_for(_request(), timeout)
+        return await _groq_retry.run(_attempt, timeout or config.GPT_HTTP_TIMEOUT)
     except Exception as e:
-        logging.error("[groq] timeout %s", mask(str(e)))
+        logging.error("[groq] failed %s", mask(repr(e)))
         return ""
 
+
+async def stream_openai(
+    *,
+    api_token: str,
+    model: str,
+    messages: list[dict],
+    max_tokens: int,
+    system: str,
+    timeout: int | None = None,
+) -> AsyncIterator[str]:
+    """Yield reply text deltas from OpenAI chat completions as they arrive."""
+    client = _get_client(api_token)
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=_chat_messages(system, messages),
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True},
+        timeout=timeout or config.GPT_HTTP_TIMEOUT,
+    )
+    async for chunk in stream:
+        if chunk.usage is not None:
+            # последний чанк без choices несёт usage всего запроса
+            _record_usage("openai", chunk.usage, "prompt_tokens", "prompt_tokens_details")
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def stream_groq(
+    *,
+    api_token: str,
+    model: str,
+    messages: list[dict],
+    max_tokens: int,
+    system: str,
+    timeout: int | None = None,
+) -> AsyncIterator[str]:
+    """Yield reply text deltas from Groq (server-sent events) as they arrive."""
+    url = f"{config.GROQ_BASE_URL.rstrip('/')}/chat/completions"
+    async with _get_http().stream(
+        "POST",
+        url,
+        headers={"Authorization": f"Bearer {api_token}"},
+        json={
+            "model": model,
+            "messages": _chat_messages(system, messages),
+            "max_tokens": max_tokens,
+            "stream": True,
+            "stream_options": {"include_usage": True},
+        },
+        timeout=timeout or config.GPT_HTTP_TIMEOUT,
+    ) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            payload = line[5:].strip()
+            if payload == "[DONE]":
+                break
+            try:
+                data = json.loads(payload)
+            except ValueError:
+                continue
+            # Groq кладёт usage в последний чанк: в "usage" или в "x_groq.usage"
+            usage = data.get("usage") or (data.get("x_groq") or {}).get("usage")
+            if usage:
+                _record_usage("groq", usage, "prompt_tokens", "prompt_tokens_details")
+            choice = (data.get("choices") or [{}])[0]
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
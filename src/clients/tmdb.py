@@ -1,12 +1,25 @@
 import asyncio
+import json
 import logging
 import time
-from dataclasses import dataclass
-from typing import Optional, List
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional, TypeVar
 
 import httpx
+from cachetools import TTLCache
 
+from src.core import db
 from src.core.config import config
+from src.domain.movies import ranking
+from src.services.title_index import TitleIndex
+from src.utils.cache import MeteredTTLCache
+from src.utils.pool_meter import MeteredTransport
+from src.utils.ratelimit import TokenBucket, parse_retry_after
+from src.utils.retry import Retry, RetryPolicy
+from src.utils.singleflight import SingleFlight
+
+
+T = TypeVar("T")
 
 
 class TMDbError(Exception):
@@ -32,6 +45,8 @@ class MovieDetails:
     year: int
     genres: Optional[str]
     genres_lang: Optional[str] = None
+    titles: dict[str, str] = field(default_factory=dict)  # язык -> локализованное название
+    genres_by_lang: dict[str, str] = field(default_factory=dict)  # язык -> жанры через запятую
 
 
 @dataclass
@@ -45,102 +60,376 @@ class Candidate:
     belongs_to_collection_id: int | None = None
     score: float = 0.0
     lang: str | None = None
+    features: ranking.CandidateFeatures | None = None  # заполняется при ранжировании
 
 
 class TMDbClient:
     def __init__(self, api_key: str, languages: list[str]):
         self.api_key = api_key
         self.languages = languages or ["ru", "en"]
-        self._client = httpx.AsyncClient(
-            base_url="https://api.themoviedb.org/3", timeout=10
+        self._client = self._make_http_client()
+        # L1: ответы TMDb в памяти, (payload, размер в байтах); L2 — таблица tmdb_cache
+        self._memory = MeteredTTLCache(
+            maxsize=config.TMDB_MEMORY_CACHE_MB * 1024 * 1024,
+            ttl=config.TMDB_MEMORY_CACHE_TTL,
+            getsizeof=lambda v: v[1],
+        )
+        # tmdb_id -> belongs_to_collection id (None — фильм вне коллекции)
+        self._collection_ids: TTLCache = TTLCache(
+            maxsize=config.TMDB_DETAILS_CACHE_SIZE, ttl=config.TMDB_DETAILS_CACHE_TTL
+        )
+        # tmdb_id -> MovieDetails со всеми языками LANG_FALLBACKS
+        self._details: TTLCache = TTLCache(
+            maxsize=config.TMDB_DETAILS_CACHE_SIZE, ttl=config.TMDB_DETAILS_CACHE_TTL
+        )
+        self._title_index = TitleIndex(config.TMDB_TITLE_INDEX) if config.TMDB_TITLE_INDEX else None
+        self._enrich_sem = asyncio.Semaphore(max(1, config.TMDB_ENRICH_CONCURRENCY))
+        self._bucket = TokenBucket(config.TMDB_RATE_PER_SEC, config.TMDB_RATE_BURST)
+        self._rate_limited = 0
+        self._flight = SingleFlight()
+        self._retry = RetryPolicy(
+            "tmdb",
+            attempts=2,
+            base_delay=1,
+            max_delay=4,
+            classify=self._classify,
+            attempt_timeout=config.TMDB_READ_TIMEOUT,
+        )
+        self._pruned = 0
+        # фоновые обновления устаревших записей постоянного кэша
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    def _make_http_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=config.TMDB_POOL_SIZE,
+            max_keepalive_connections=config.TMDB_POOL_KEEPALIVE,
+            keepalive_expiry=config.TMDB_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            config.TMDB_READ_TIMEOUT,
+            connect=config.TMDB_CONNECT_TIMEOUT,
+            pool=config.TMDB_READ_TIMEOUT,
+        )
+        transport = None
+        if config.TMDB_HTTP2:
+            try:
+                transport = httpx.AsyncHTTPTransport(http2=True, limits=limits)
+            except ImportError:
+                logging.warning("tmdb http2 requested but h2 is not installed, using HTTP/1.1")
+        # счётчики пула — через обёртку транспорта, без приватных полей httpx/httpcore
+        self._pool_meter = MeteredTransport(
+            transport or httpx.AsyncHTTPTransport(limits=limits)
+        )
+        return httpx.AsyncClient(
+            base_url="https://api.themoviedb.org/3",
+            timeout=timeout,
+            transport=self._pool_meter,
         )
-        self._search_cache: dict[tuple[str, Optional[int]], tuple[float, Optional[int]]] = {}
+
+    def pool_stats(self) -> dict:
+        """Connection pool utilisation: requests in flight or waiting for a connection."""
+        return {"max": config.TMDB_POOL_SIZE, **self._pool_meter.stats()}
 
     async def aclose(self) -> None:
+        if self._title_index is not None:
+            self._title_index.close()
+        for task in list(self._refreshing.values()):
+            task.cancel()
         await self._client.aclose()
 
+    @staticmethod
+    def _cache_ttl(path: str) -> int:
+        """Freshness of persistently cached responses for ``path`` (0 — not cached)."""
+        if path == "/search/movie":
+            return config.TMDB_CACHE_TTL_SEARCH
+        if path.startswith("/movie/") or path.startswith("/genre/"):
+            return config.TMDB_CACHE_TTL_MOVIE
+        if path.startswith("/collection/"):
+            return config.TMDB_CACHE_TTL_COLLECTION
+        return 0
+
+    @staticmethod
+    def _cache_key(path: str, params: dict) -> str:
+        return path + "?" + json.dumps(params, sort_keys=True, ensure_ascii=False)
+
     async def _get(self, path: str, params: dict, retries: int = 2) -> dict:
-        params = {**params, "api_key": self.api_key}
-        delay = 1
-        for attempt in range(retries):
+        """GET through the memory cache and the persistent cache.
+
+        Returned payloads are shared between callers and must not be mutated.
+        """
+        key = self._cache_key(path, params)
+        ttl = self._cache_ttl(path)
+        if not ttl:
+            return await self._flight.do(key, lambda: self._fetch(path, params, retries))
+        hit = self._memory.lookup(key)
+        if hit is not None:
+            return hit[0]
+        # одинаковые одновременные промахи ждут один общий запрос
+        return await self._flight.do(
+            key, lambda: self._load(key, ttl, path, params, retries)
+        )
+
+    async def _load(
+        self, key: str, ttl: int, path: str, params: dict, retries: int
+    ) -> dict:
+        data = await self._get_persistent(key, ttl, path, params, retries)
+        self._remember(key, data)
+        return data
+
+    async def _get_persistent(
+        self, key: str, ttl: int, path: str, params: dict, retries: int
+    ) -> dict:
+        """Read from ``tmdb_cache`` with stale-while-revalidate, else fetch."""
+        if not config.TMDB_PERSISTENT_CACHE:
+            return await self._fetch(path, params, retries)
+        try:
+            cached = await db.tmdb_cache_get(key)
+        except Exception as e:
+            logging.warning("tmdb cache read failed: %s", e)
+            cached = None
+        if cached:
+            payload, age = cached
+            if age < ttl:
+                return payload
+            if age < ttl + config.TMDB_CACHE_STALE:
+                self._schedule_refresh(key, path, params)
+                return payload
+        data = await self._fetch(path, params, retries)
+        await self._cache_store(key, data)
+        return data
+
+    def _remember(self, key: str, data: dict) -> None:
+        size = len(key) + len(json.dumps(data, ensure_ascii=False))
+        self._memory.store(key, (data, size))
+
+    def stats(self) -> dict:
+        return {
+            "memory_cache": self._memory.stats(),
+            "rate_limiter": {**self._bucket.stats(), "http_429": self._rate_limited},
+            "coalescing": self._flight.stats(),
+            "retry": self._retry.stats(),
+            "title_index": self._title_index.stats() if self._title_index else None,
+            "pool": self.pool_stats(),
+            "cache_pruned": self._pruned,
+        }
+
+    async def prune_cache(self) -> int:
+        """Delete persistent cache rows too old to be served even as stale."""
+        # префиксы ключей -> возраст, после которого запись уже не отдаётся
+        max_age = {
+            prefix: self._cache_ttl(prefix) + config.TMDB_CACHE_STALE
+            for prefix in ("/search/movie", "/movie/", "/genre/", "/collection/")
+        }
+        deleted = await db.tmdb_cache_prune(max_age)
+        self._pruned += deleted
+        return deleted
+
+    def _schedule_refresh(self, key: str, path: str, params: dict) -> None:
+        if key in self._refreshing:
+            return
+
+        async def _refresh() -> None:
             try:
-                r = await self._client.get(path, params=params)
-            except httpx.RequestError as e:
-                logging.error("tmdb network error: %s", e)
-                if attempt == retries - 1:
-                    raise TMDbUnavailableError from e
-                await asyncio.sleep(delay)
-                delay *= 2
-                continue
+                data = await self._fetch(path, params)
+                await self._cache_store(key, data)
+                self._remember(key, data)
+            except TMDbError as e:
+                logging.warning("tmdb refresh failed path=%s: %r", path, e)
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(_refresh())
+
+    @staticmethod
+    async def _cache_store(key: str, data: dict) -> None:
+        try:
+            await db.tmdb_cache_put(key, data)
+        except Exception as e:
+            logging.warning("tmdb cache write failed: %s", e)
+
+    def _classify(self, e: BaseException) -> Optional[Retry]:
+        if isinstance(e, httpx.HTTPStatusError):
+            r = e.response
             text = r.text[:100].replace("\n", " ")
-            logging.debug("tmdb %s %s", r.status_code, text)
-            if r.status_code == 401:
-                logging.error("tmdb 401: %s", text)
-                raise TMDbAuthError
             if r.status_code == 429:
-                logging.warning("tmdb 429: %s", text)
-                raise TMDbRateLimitError
+                # 429 не считается попыткой: ждём Retry-After, пока укладываемся в дедлайн
+                wait = parse_retry_after(r.headers.get("Retry-After")) or 1.0
+                if wait > config.TMDB_RATE_LIMIT_DEADLINE:
+                    logging.warning("tmdb 429 (retry_after=%.1fs, giving up): %s", wait, text)
+                    return None
+                logging.warning("tmdb 429 (retry_after=%.1fs, queued): %s", wait, text)
+                self._rate_limited += 1
+                self._bucket.pause(wait)
+                return Retry(after=wait, counts=False)
             if r.status_code >= 500:
                 logging.error("tmdb %s: %s", r.status_code, text)
-                if attempt == retries - 1:
-                    raise TMDbUnavailableError
-                await asyncio.sleep(delay)
-                delay *= 2
-                continue
+                return Retry()
+            return None
+        if isinstance(e, (httpx.TransportError, TimeoutError)):
+            logging.error("tmdb network error: %r", e)
+            return Retry()
+        return None
+
+    async def _fetch(self, path: str, params: dict, retries: int = 2) -> dict:
+        params = {**params, "api_key": self.api_key}
+
+        async def attempt(budget: float) -> dict:
+            await self._bucket.acquire()
+            r = await self._client.get(
+                path,
+                params=params,
+                timeout=httpx.Timeout(budget, connect=min(config.TMDB_CONNECT_TIMEOUT, budget)),
+            )
+            logging.debug("tmdb %s %s", r.status_code, r.text[:100].replace("\n", " "))
+            if r.status_code == 401:
+                logging.error("tmdb 401: %s", r.text[:100])
+                raise TMDbAuthError
             r.raise_for_status()
             return r.json()
-        raise TMDbUnavailableError
 
-    async def search_candidates(self, query: str, user_year: int | None) -> List[Candidate]:
-        """Return list of movie candidates for given query."""
-        results: list[dict] = []
-        for lang in self.languages:
-            params = {"query": query, "language": lang}
-            if user_year:
-                params["year"] = user_year
-                data = await self._get("/search/movie", params)
-                results = data.get("results") or []
-                if results:
-                    break
-                params.pop("year")
+        try:
+            return await self._retry.run(attempt, config.TMDB_REQUEST_DEADLINE, retries)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429:
+                raise TMDbRateLimitError from e
+            if e.response.status_code >= 500:
+                raise TMDbUnavailableError from e
+            raise
+        except (httpx.TransportError, TimeoutError) as e:
+            raise TMDbUnavailableError from e
+
+    async def _by_language(
+        self,
+        fetch: Callable[[str], Awaitable[T]],
+        take: Callable[[str, T], bool],
+    ) -> None:
+        """Feed ``fetch(lang)`` results to ``take`` in priority order until it returns True.
+
+        With ``TMDB_PARALLEL_LANGS`` all languages are requested at once and the
+        requests still pending when ``take`` accepts a result are cancelled.
+        """
+        if not config.TMDB_PARALLEL_LANGS or len(self.languages) < 2:
+            for lang in self.languages:
+                if take(lang, await fetch(lang)):
+                    return
+            return
+        tasks = [asyncio.ensure_future(fetch(lang)) for lang in self.languages]
+        try:
+            for lang, task in zip(self.languages, tasks):
+                if take(lang, await task):
+                    return
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _search_lang(self, query: str, year: int | None, lang: str) -> list[dict]:
+        """Search in one language: with the year first, then without it."""
+        params = {"query": query, "language": lang}
+        if year:
+            params["year"] = year
             data = await self._get("/search/movie", params)
             results = data.get("results") or []
             if results:
-                break
+                return results
+            params.pop("year")
+        data = await self._get("/search/movie", params)
+        return data.get("results") or []
+
+    async def _search(self, query: str, year: int | None) -> tuple[list[dict], str]:
+        """Return results of the first language that found anything."""
+        found: list[dict] = []
+        found_lang = self.languages[-1]
+
+        def _take(lang: str, results: list[dict]) -> bool:
+            nonlocal found, found_lang
+            if not results:
+                return False
+            found, found_lang = results, lang
+            return True
+
+        await self._by_language(lambda lang: self._search_lang(query, year, lang), _take)
+        return found, found_lang
+
+    async def search_candidates(self, query: str, user_year: int | None) -> List[Candidate]:
+        """Return list of movie candidates for given query."""
+        if self._title_index is not None:
+            indexed = await self._search_index(query, user_year)
+            if indexed is not None:
+                return indexed
+
+        results, lang = await self._search(query, user_year)
 
         candidates: list[Candidate] = []
         for r in results[:10]:
             media_type = "movie"  # search/movie returns movies only
             if media_type != "movie":
                 continue
-            release_date = r.get("release_date") or ""
-            release_year = None
-            if len(release_date) >= 4:
-                try:
-                    release_year = int(release_date[:4])
-                except ValueError:
-                    release_year = None
-            cand = Candidate(
-                tmdb_id=r.get("id"),
-                title_localized=r.get("title") or r.get("original_title") or "",
-                original_title=r.get("original_title") or r.get("title") or "",
-                release_year=release_year,
-                popularity=r.get("popularity", 0.0),
-                media_type=media_type,
-                lang=lang,
-            )
-            candidates.append(cand)
+            candidates.append(self._candidate_from(r, lang))
 
         # enrich with collection ids for top results
-        for cand in candidates[:5]:
+        await asyncio.gather(*(self._enrich_collection(c) for c in candidates[:5]))
+        return candidates
+
+    @staticmethod
+    def _candidate_from(r: dict, lang: str) -> Candidate:
+        release_date = r.get("release_date") or ""
+        release_year = None
+        if len(release_date) >= 4:
             try:
-                data = await self._get(f"/movie/{cand.tmdb_id}", {"language": self.languages[0]})
-            except TMDbError:
-                data = {}
+                release_year = int(release_date[:4])
+            except ValueError:
+                release_year = None
+        return Candidate(
+            tmdb_id=r.get("id"),
+            title_localized=r.get("title") or r.get("original_title") or "",
+            original_title=r.get("original_title") or r.get("title") or "",
+            release_year=release_year,
+            popularity=r.get("popularity", 0.0),
+            media_type="movie",
+            lang=lang,
+        )
+
+    async def _search_index(self, query: str, user_year: int | None) -> Optional[List[Candidate]]:
+        """Answer from the local title index; None means "ask the API"."""
+        ids = self._title_index.lookup(query, limit=5)
+        if not ids:
+            return None
+
+        async def _load(movie_id: int) -> Optional[Candidate]:
+            async with self._enrich_sem:
+                try:
+                    data = await self._get(f"/movie/{movie_id}", self._movie_params())
+                except TMDbError:
+                    return None
+            if not data:
+                return None
+            cand = self._candidate_from(data, self.languages[0])
             belongs = data.get("belongs_to_collection") or {}
             cand.belongs_to_collection_id = belongs.get("id")
-
-        return candidates
+            self._collection_ids[movie_id] = cand.belongs_to_collection_id
+            return cand
+
+        candidates = [c for c in await asyncio.gather(*(_load(i) for i in ids)) if c]
+        if user_year:
+            # индекс не знает годов: если нужного года среди найденных нет, ищем через API
+            candidates = [c for c in candidates if c.release_year == user_year]
+        return candidates or None
+
+    async def _enrich_collection(self, cand: Candidate) -> None:
+        """Fill ``belongs_to_collection_id`` from cache or ``/movie/{id}``."""
+        if cand.tmdb_id in self._collection_ids:
+            cand.belongs_to_collection_id = self._collection_ids[cand.tmdb_id]
+            return
+        async with self._enrich_sem:
+            try:
+                data = await self._get(f"/movie/{cand.tmdb_id}", self._movie_params())
+            except TMDbError:
+                # ошибку не кэшируем — в следующий раз попробуем снова
+                return
+        belongs = data.get("belongs_to_collection") or {}
+        cand.belongs_to_collection_id = belongs.get("id")
+        self._collection_ids[cand.tmdb_id] = cand.belongs_to_collection_id
 
     async def fetch_collection_parts(self, collection_id: int) -> List[Candidate]:
         data = await self._get(
@@ -177,97 +466,120 @@ class TMDbClient:
         query: str | None,
     ) -> List[Candidate]:
         """Apply heuristic scoring and return sorted list."""
-
-        def _has_part(title: str, part: int) -> bool:
-            title_lower = title.lower()
-            arabic = str(part)
-            romans = [
-                "i",
-                "ii",
-                "iii",
-                "iv",
-                "v",
-                "vi",
-                "vii",
-                "viii",
-                "ix",
-                "x",
-            ]
-            roman = romans[part - 1] if 0 < part <= len(romans) else ""
-            patterns = [
-                arabic,
-                roman,
-                f"part {arabic}",
-                f"part {roman}",
-                f"chapter {arabic}",
-                f"chapter {roman}",
-                f"volume {arabic}",
-                f"volume {roman}",
-            ]
-            return any(p in title_lower for p in patterns if p)
-
-        for cand in cands:
-            score = cand.popularity
-            if user_year and cand.release_year == user_year:
-                score *= 1.1
-            if part_hint and (
-                _has_part(cand.title_localized, part_hint)
-                or _has_part(cand.original_title, part_hint)
-            ):
-                score *= 1.2
-            if query and (
-                cand.title_localized.lower() == query.lower()
-                or cand.original_title.lower() == query.lower()
-            ):
-                score *= 1.1
-            cand.score = score
-        cands.sort(key=lambda c: c.score, reverse=True)
-        return cands
+        return ranking.score_batch(cands, user_year, part_hint, query)
 
     async def search_movie(self, query: str, year: Optional[int]) -> Optional[int]:
-        key = (query.lower(), year)
-        cached = self._search_cache.get(key)
-        now = time.time()
-        if cached and now - cached[0] < 60:
-            return cached[1]
-
         result_id: Optional[int] = None
-        for lang in self.languages:
-            params = {"query": query, "language": lang}
-            if year:
-                params["year"] = year
-                data = await self._get("/search/movie", params)
-                results = data.get("results") or []
-                if results:
-                    break
-                params.pop("year")
-            data = await self._get("/search/movie", params)
-            results = data.get("results") or []
-            if results:
-                break
+        results, _ = await self._search(query, year)
         if results:
-            results.sort(
+            best = max(
+                results,
                 key=lambda r: (r.get("popularity", 0), r.get("vote_count", 0)),
-                reverse=True,
             )
-            result_id = results[0]["id"]
-        self._search_cache[key] = (now, result_id)
+            result_id = best["id"]
         return result_id
 
+    def _movie_params(self) -> dict:
+        """Params of the primary ``/movie/{id}`` request, shared with enrichment."""
+        params = {"language": self.languages[0]}
+        if config.TMDB_DETAILS_APPEND:
+            params["append_to_response"] = "translations"
+        return params
+
     async def get_movie_details(self, movie_id: int) -> Optional[MovieDetails]:
-        first_details: MovieDetails | None = None
+        if not config.TMDB_DETAILS_APPEND:
+            return await self._get_movie_details_by_language(movie_id)
+        cached = self._details.get(movie_id)
+        if cached is not None:
+            return cached
+        data = await self._get(f"/movie/{movie_id}", self._movie_params())
+        if not data:
+            return None
+        belongs = data.get("belongs_to_collection") or {}
+        self._collection_ids[movie_id] = belongs.get("id")
+        release_date = data.get("release_date") or ""
+        try:
+            year = int(release_date[:4]) if len(release_date) >= 4 else None
+        except ValueError:
+            year = None
+        if year is None:
+            return None
+        genres_by_lang = await self._genres_by_lang(data)
+        genres_lang = next((lang for lang in self.languages if genres_by_lang.get(lang)), None)
+        details = MovieDetails(
+            tmdb_id=data["id"],
+            title=data.get("title") or data.get("original_title"),
+            year=year,
+            genres=genres_by_lang.get(genres_lang) if genres_lang else None,
+            genres_lang=genres_lang,
+            titles=self._titles_by_lang(data),
+            genres_by_lang=genres_by_lang,
+        )
+        self._details[movie_id] = details
+        return details
+
+    def _titles_by_lang(self, data: dict) -> dict[str, str]:
+        """Localized titles for LANG_FALLBACKS from ``append_to_response=translations``."""
+        titles: dict[str, str] = {}
+        primary = data.get("title") or data.get("original_title")
+        if primary:
+            titles[self.languages[0]] = primary
+        translations = (data.get("translations") or {}).get("translations") or []
+        for tr in translations:
+            lang = tr.get("iso_639_1")
+            title = (tr.get("data") or {}).get("title")
+            if lang in self.languages and title and lang not in titles:
+                titles[lang] = title
+        original = data.get("original_title")
         for lang in self.languages:
-            data = await self._get(f"/movie/{movie_id}", {"language": lang})
+            if lang not in titles and original:
+                titles[lang] = original
+        return titles
+
+    async def _genres_by_lang(self, data: dict) -> dict[str, str]:
+        """Genre names per language: primary from the payload, others via cached genre lists."""
+        genres = data.get("genres") or []
+        ids = [g.get("id") for g in genres]
+        if not ids:
+            return {}
+        result: dict[str, str] = {}
+        primary = ", ".join(g.get("name") for g in genres if g.get("name"))
+        if primary:
+            result[self.languages[0]] = primary
+
+        async def _names(lang: str) -> tuple[str, str]:
+            try:
+                listing = await self._get("/genre/movie/list", {"language": lang})
+            except TMDbError:
+                return lang, ""
+            by_id = {g.get("id"): g.get("name") for g in listing.get("genres") or []}
+            return lang, ", ".join(by_id[i] for i in ids if by_id.get(i))
+
+        for lang, names in await asyncio.gather(*(_names(l) for l in self.languages[1:])):
+            if names:
+                result[lang] = names
+        return result
+
+    async def _get_movie_details_by_language(self, movie_id: int) -> Optional[MovieDetails]:
+        first_details: MovieDetails | None = None
+        no_date = False
+
+        def _take(lang: str, data: dict) -> bool:
+            nonlocal first_details, no_date
             if not data:
-                continue
+                return False
+            if lang == self.languages[0]:
+                belongs = data.get("belongs_to_collection") or {}
+                self._collection_ids[movie_id] = belongs.get("id")
             title = data.get("title") or data.get("original_title")
             release_date = data.get("release_date") or ""
-            if len(release_date) < 4:
-                return None
             try:
-                year = int(release_date[:4])
+                year = int(release_date[:4]) if len(release_date) >= 4 else None
             except ValueError:
-                return None
+                year = None
+            if year is None:
+                no_date = True
+                return True
             genres = ", ".join(g.get("name") for g in data.get("genres") or []) or None
             if not first_details:
                 first_details = MovieDetails(
@@ -277,13 +589,17 @@ class TMDbClient:
                     genres=genres,
                     genres_lang=lang if genres else None,
                 )
-                if genres:
-                    return first_details
+                return bool(genres)
             if genres and not first_details.genres:
                 first_details.genres = genres
                 first_details.genres_lang = lang
-                return first_details
-        return first_details
+                return True
+            return False
+
+        await self._by_language(
+            lambda lang: self._get(f"/movie/{movie_id}", {"language": lang}), _take
+        )
+        return None if no_date else first_details
 
     async def check_key(self) -> None:
         await self._get("/configuration", {})
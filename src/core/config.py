@@ -39,6 +39,38 @@ class Config:
     MAX_PROMPT_CHARS: int = _get_int("MAX_PROMPT_CHARS", 2000)  # макс. длина входного текста пользователя
     MAX_REPLY_CHARS: int = _get_int("MAX_REPLY_CHARS", 3500)  # макс. длина ответа, символов
     DIALOG_HISTORY_LEN: int = _get_int("DIALOG_HISTORY_LEN", 5)  # сколько последних сообщений хранить в истории
+    GPT_CONTEXT_TOKENS_OPENAI: int = _get_int(
+        "GPT_CONTEXT_TOKENS_OPENAI", 4000
+    )  # бюджет токенов на запрос к OpenAI: система + история + вопрос + ответ
+    GPT_CONTEXT_TOKENS_GROQ: int = _get_int(
+        "GPT_CONTEXT_TOKENS_GROQ", 4000
+    )  # бюджет токенов на запрос к Groq
+    GPT_MIN_REPLY_TOKENS: int = _get_int(
+        "GPT_MIN_REPLY_TOKENS", 100
+    )  # сколько токенов на ответ оставлять всегда, даже при длинной истории
+    GPT_DIALOG_MAX_CHATS: int = _get_int(
+        "GPT_DIALOG_MAX_CHATS", 1000
+    )  # сколько чатов держать в памяти; дольше всех молчащие вытесняются
+    GPT_DIALOG_MAX_MB: int = _get_int("GPT_DIALOG_MAX_MB", 16)  # предел памяти под историю всех чатов, МБ
+    GPT_DIALOG_PERSIST: bool = _get_bool(
+        "GPT_DIALOG_PERSIST", False
+    )  # сохранять историю в Postgres (таблица gpt_dialogs), чтобы пережить рестарт
+    GPT_DIALOG_FLUSH_INTERVAL: int = _get_int(
+        "GPT_DIALOG_FLUSH_INTERVAL", 30
+    )  # как часто сбрасывать изменённую историю в Postgres, сек
+    GPT_SUMMARIZE: bool = _get_bool(
+        "GPT_SUMMARIZE", False
+    )  # сжимать старые реплики в краткое содержание моделью Groq (в фоне)
+    GPT_SUMMARY_MODEL: str = os.getenv(
+        "GPT_SUMMARY_MODEL", "llama-3.1-8b-instant"
+    )  # дешёвая модель Groq для краткого содержания
+    GPT_SUMMARY_KEEP_TURNS: int = _get_int(
+        "GPT_SUMMARY_KEEP_TURNS", 4
+    )  # сколько последних реплик всегда отправлять дословно
+    GPT_SUMMARY_EVERY: int = _get_int(
+        "GPT_SUMMARY_EVERY", 4
+    )  # сколько реплик сверх дословных накопить перед очередным сжатием
+    GPT_SUMMARY_MAX_TOKENS: int = _get_int("GPT_SUMMARY_MAX_TOKENS", 200)  # предел длины краткого содержания
     GPT_HTTP_TIMEOUT: int = _get_int(
         "GPT_HTTP_TIMEOUT", 30
     )  # таймаут HTTP-запросов к GPT, сек
@@ -48,12 +80,72 @@ class Config:
     GPT_RETRY_BACKOFF_BASE: int = _get_int(
         "GPT_RETRY_BACKOFF_BASE", 1
     )  # базовая задержка между повторными запросами, сек
+    GPT_RETRY_BACKOFF_MAX: int = _get_int(
+        "GPT_RETRY_BACKOFF_MAX", 8
+    )  # предел задержки между повторами, сек (фактическая — случайная от 0 до предела)
+    GPT_STREAM: bool = _get_bool(
+        "GPT_STREAM", False
+    )  # потоковый ответ: заглушка в чате, дописываемая по мере генерации
+    GPT_STREAM_EDIT_INTERVAL_MS: int = _get_int(
+        "GPT_STREAM_EDIT_INTERVAL_MS", 1000
+    )  # как часто редактировать сообщение при потоковом ответе, мс
+    GPT_HEDGE: bool = _get_bool(
+        "GPT_HEDGE", False
+    )  # если основной провайдер не ответил за свой p95 — параллельно спросить второй
+    GPT_HEDGE_WINDOW: int = _get_int("GPT_HEDGE_WINDOW", 200)  # сколько последних задержек учитывать
+    GPT_HEDGE_MIN_SAMPLES: int = _get_int(
+        "GPT_HEDGE_MIN_SAMPLES", 20
+    )  # минимум замеров, чтобы доверять p95
+    GPT_HEDGE_DEFAULT_DELAY_MS: int = _get_int(
+        "GPT_HEDGE_DEFAULT_DELAY_MS", 8000
+    )  # порог хеджирования, пока замеров мало, мс
+    GPT_DEBOUNCE_MS: int = _get_int(
+        "GPT_DEBOUNCE_MS", 0
+    )  # склеивать сообщения одного пользователя, пришедшие в пределах окна, мс (0 — выкл.)
+    GPT_CANCEL_SUPERSEDED: bool = _get_bool(
+        "GPT_CANCEL_SUPERSEDED", False
+    )  # новое сообщение отменяет незаконченный ответ тому же пользователю
+    GPT_CONCURRENCY_GROQ: int = _get_int(
+        "GPT_CONCURRENCY_GROQ", 8
+    )  # сколько запросов к Groq выполняется одновременно
+    GPT_CONCURRENCY_OPENAI: int = _get_int(
+        "GPT_CONCURRENCY_OPENAI", 8
+    )  # сколько запросов к OpenAI выполняется одновременно
+    GPT_QUEUE_MAX: int = _get_int(
+        "GPT_QUEUE_MAX", 50
+    )  # длина очереди к провайдеру, после которой сразу отвечаем «занято»
+    GPT_BREAKER_THRESHOLD: int = _get_int(
+        "GPT_BREAKER_THRESHOLD", 5
+    )  # после стольких неудач подряд провайдер считается недоступным (0 — выкл.)
+    GPT_BREAKER_RESET: int = _get_int(
+        "GPT_BREAKER_RESET", 30
+    )  # через сколько секунд пробовать недоступного провайдера снова
+    GPT_CACHE_TTL: int = _get_int(
+        "GPT_CACHE_TTL", 3600
+    )  # сколько хранить ответ на точно такой же вопрос, сек (0 — кэш выключен)
+    GPT_CACHE_SIZE: int = _get_int("GPT_CACHE_SIZE", 1000)  # сколько ответов держать в кэше
+    GROQ_BASE_URL: str = os.getenv(
+        "GROQ_BASE_URL", "https://api.groq.com/openai/v1"
+    )  # адрес OpenAI-совместимого API Groq
+    GPT_POOL_SIZE: int = _get_int("GPT_POOL_SIZE", 20)  # макс. соединений к провайдерам GPT
+    GPT_KEEPALIVE_EXPIRY: int = _get_int(
+        "GPT_KEEPALIVE_EXPIRY", 60
+    )  # через сколько закрывать простаивающее соединение, сек
 
     # --- Вебхук/поллинг ---
     USE_WEBHOOK: bool = _get_bool("USE_WEBHOOK", False)  # режим вебхука: true — вебхук, false — polling
     WEBHOOK_URL: Optional[str] = os.getenv("WEBHOOK_URL") or None  # публичный URL вебхука (если включён)
     WEBHOOK_SECRET: Optional[str] = os.getenv("WEBHOOK_SECRET") or None  # секрет для проверок вебхука (если нужен)
     PORT: int = _get_int("PORT", 8080)  # порт для вебхука/сервера
+    WEBHOOK_MAX_CONNECTIONS: int = _get_int(
+        "WEBHOOK_MAX_CONNECTIONS", 40
+    )  # сколько соединений Telegram держит к вебхуку одновременно (1–100)
+    WEBHOOK_DROP_PENDING: bool = _get_bool(
+        "WEBHOOK_DROP_PENDING", False
+    )  # сбрасывать накопившиеся апдейты при старте (не включать при нескольких экземплярах)
+    UPDATE_CONCURRENCY: int = _get_int(
+        "UPDATE_CONCURRENCY", 32
+    )  # сколько апдейтов обрабатывать одновременно (в одном чате — всегда по очереди)
 
     # --- База данных и архив ---
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")  # строка подключения к Postgres (может быть пустой локально)
@@ -81,6 +173,79 @@ class Config:
         "LIST_PAGE_SIZE", 30
     )  # сколько последних фильмов показывать командой /list
 
+    # --- TMDb ---
+    TMDB_HTTP2: bool = _get_bool("TMDB_HTTP2", True)  # HTTP/2 к TMDb (нужен пакет h2)
+    TMDB_POOL_SIZE: int = _get_int("TMDB_POOL_SIZE", 20)  # макс. соединений с TMDb
+    TMDB_POOL_KEEPALIVE: int = _get_int(
+        "TMDB_POOL_KEEPALIVE", 10
+    )  # сколько простаивающих соединений держать открытыми
+    TMDB_KEEPALIVE_EXPIRY: int = _get_int(
+        "TMDB_KEEPALIVE_EXPIRY", 60
+    )  # через сколько закрывать простаивающее соединение, сек
+    TMDB_CONNECT_TIMEOUT: int = _get_int("TMDB_CONNECT_TIMEOUT", 5)  # таймаут соединения с TMDb, сек
+    TMDB_READ_TIMEOUT: int = _get_int(
+        "TMDB_READ_TIMEOUT", 10
+    )  # таймаут чтения ответа и ожидания свободного соединения, сек
+    TMDB_ENRICH_CONCURRENCY: int = _get_int(
+        "TMDB_ENRICH_CONCURRENCY", 5
+    )  # сколько запросов /movie/{id} выполнять параллельно при обогащении кандидатов
+    TMDB_DETAILS_CACHE_SIZE: int = _get_int(
+        "TMDB_DETAILS_CACHE_SIZE", 2000
+    )  # сколько фильмов держать в кэше коллекций и деталей
+    TMDB_DETAILS_CACHE_TTL: int = _get_int(
+        "TMDB_DETAILS_CACHE_TTL", 86400
+    )  # TTL кэша коллекций и деталей фильмов, сек
+    TMDB_PERSISTENT_CACHE: bool = _get_bool(
+        "TMDB_PERSISTENT_CACHE", True
+    )  # хранить ответы TMDb в таблице tmdb_cache (переживает рестарты)
+    TMDB_CACHE_TTL_SEARCH: int = _get_int(
+        "TMDB_CACHE_TTL_SEARCH", 6 * 3600
+    )  # свежесть /search/movie в постоянном кэше, сек
+    TMDB_CACHE_TTL_MOVIE: int = _get_int(
+        "TMDB_CACHE_TTL_MOVIE", 7 * 86400
+    )  # свежесть /movie/{id}, сек
+    TMDB_CACHE_TTL_COLLECTION: int = _get_int(
+        "TMDB_CACHE_TTL_COLLECTION", 7 * 86400
+    )  # свежесть /collection/{id}, сек
+    TMDB_CACHE_STALE: int = _get_int(
+        "TMDB_CACHE_STALE", 30 * 86400
+    )  # сколько ещё отдавать устаревший ответ, обновляя его в фоне, сек
+    TMDB_CACHE_PRUNE_INTERVAL: int = _get_int(
+        "TMDB_CACHE_PRUNE_INTERVAL", 6 * 3600
+    )  # как часто удалять из tmdb_cache записи старше TTL + STALE, сек (0 — не удалять)
+    TMDB_MEMORY_CACHE_MB: int = _get_int(
+        "TMDB_MEMORY_CACHE_MB", 32
+    )  # потолок памяти под кэш ответов TMDb в процессе, МБ
+    TMDB_MEMORY_CACHE_TTL: int = _get_int(
+        "TMDB_MEMORY_CACHE_TTL", 600
+    )  # TTL записей кэша в памяти, сек
+    TMDB_RATE_PER_SEC: int = _get_int(
+        "TMDB_RATE_PER_SEC", 20
+    )  # темп исходящих запросов к TMDb (ниже их лимита), запросов/сек
+    TMDB_RATE_BURST: int = _get_int(
+        "TMDB_RATE_BURST", 20
+    )  # сколько запросов можно отправить пачкой
+    TMDB_RATE_LIMIT_DEADLINE: int = _get_int(
+        "TMDB_RATE_LIMIT_DEADLINE", 10
+    )  # самый долгий Retry-After после 429, который готовы ждать, сек
+    TMDB_REQUEST_DEADLINE: int = _get_int(
+        "TMDB_REQUEST_DEADLINE", 20
+    )  # общий срок на запрос к TMDb со всеми повторами, сек
+    TMDB_PARALLEL_LANGS: bool = _get_bool(
+        "TMDB_PARALLEL_LANGS", False
+    )  # запрашивать все языки LANG_FALLBACKS одновременно, брать первый подходящий по порядку
+    TMDB_DETAILS_APPEND: bool = _get_bool(
+        "TMDB_DETAILS_APPEND", True
+    )  # детали фильма одним запросом с append_to_response=translations вместо запроса на каждый язык
+    TMDB_TITLE_INDEX: Optional[str] = (
+        os.getenv("TMDB_TITLE_INDEX") or None
+    )  # путь к локальному индексу названий (python -m src.services.title_index), пусто — выключен
+
+    # --- Статистика ---
+    STATS_LOG_INTERVAL: int = _get_int(
+        "STATS_LOG_INTERVAL", 900
+    )  # как часто писать счётчики в лог, сек (0 — только при остановке)
+
     # --- Параметры команд ---
     ADD_PENDING_TTL: int = _get_int("ADD_PENDING_TTL", 120)  # TTL выбора фильма, сек
     ADD_YEAR_MIN: int = _get_int("ADD_YEAR_MIN", 1888)       # минимальный год релиза
@@ -1,3 +1,4 @@
+import json
 import logging
 import secrets
 from typing import Optional
@@ -22,6 +23,8 @@ async def init() -> None:
         pool = await asyncpg.create_pool(dsn=config.DATABASE_URL)
         logging.info("DB connected")
         await _create_indexes()
+        await _create_tmdb_cache_table()
+        await _create_gpt_dialogs_table()
     except Exception as e:  # connection/config errors
         logging.error("db init failed: %s", e)
         raise SystemExit("Не удалось подключиться к БД. Проверьте переменную окружения.")
@@ -131,6 +134,131 @@ async def _create_indexes() -> None:
     logging.info("db indexes ok")
 
 
+async def _create_tmdb_cache_table() -> None:
+    assert pool is not None
+    await pool.execute(
+        """
+        CREATE TABLE IF NOT EXISTS tmdb_cache (
+            key TEXT PRIMARY KEY,
+            payload JSONB NOT NULL,
+            fetched_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+        """
+    )
+    # для периодической чистки устаревших записей
+    await pool.execute(
+        "CREATE INDEX IF NOT EXISTS tmdb_cache_fetched_at ON tmdb_cache (fetched_at)"
+    )
+    logging.info("db tmdb_cache ok")
+
+
+# кэш ответов TMDb, переживающий рестарты
+
+
+async def tmdb_cache_get(key: str) -> Optional[tuple[dict, float]]:
+    """Return (payload, age in seconds) for cached TMDb response."""
+    if pool is None:
+        return None
+    row = await pool.fetchrow(
+        """
+        SELECT payload, EXTRACT(EPOCH FROM NOW() - fetched_at) AS age
+        FROM tmdb_cache
+        WHERE key = $1
+        """,
+        key,
+    )
+    if not row:
+        return None
+    return json.loads(row["payload"]), float(row["age"])
+
+
+async def tmdb_cache_put(key: str, payload: dict) -> None:
+    """Insert or refresh cached TMDb response."""
+    if pool is None:
+        return
+    await pool.execute(
+        """
+        INSERT INTO tmdb_cache (key, payload, fetched_at)
+        VALUES ($1, $2::jsonb, NOW())
+        ON CONFLICT (key) DO UPDATE
+        SET payload = EXCLUDED.payload,
+            fetched_at = EXCLUDED.fetched_at
+        """,
+        key,
+        json.dumps(payload, ensure_ascii=False),
+    )
+
+
+async def tmdb_cache_prune(max_age: dict[str, int]) -> int:
+    """Delete rows older than ``max_age[prefix]`` seconds for keys starting with ``prefix``."""
+    if pool is None:
+        return 0
+    deleted = 0
+    for prefix, seconds in max_age.items():
+        status = await pool.execute(
+            """
+            DELETE FROM tmdb_cache
+            WHERE key LIKE $1 || '%' AND fetched_at < NOW() - make_interval(secs => $2)
+            """,
+            prefix,
+            float(seconds),
+        )
+        deleted += int(status.split()[-1])  # "DELETE <n>"
+    return deleted
+
+
+async def _create_gpt_dialogs_table() -> None:
+    assert pool is not None
+    await pool.execute(
+        """
+        CREATE TABLE IF NOT EXISTS gpt_dialogs (
+            chat_id BIGINT PRIMARY KEY,
+            turns JSONB NOT NULL,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+        """
+    )
+    await pool.execute(
+        "ALTER TABLE gpt_dialogs ADD COLUMN IF NOT EXISTS summary TEXT NOT NULL DEFAULT ''"
+    )
+    logging.info("db gpt_dialogs ok")
+
+
+# история GPT-диалогов, переживающая рестарты
+
+
+async def gpt_dialog_get(chat_id: int) -> Optional[tuple[list, str]]:
+    """Return stored turns ``[[role, content, tokens], ...]`` and summary of a chat."""
+    if pool is None:
+        return None
+    row = await pool.fetchrow(
+        "SELECT turns, summary FROM gpt_dialogs WHERE chat_id = $1", chat_id
+    )
+    if not row:
+        return None
+    return json.loads(row["turns"]), row["summary"]
+
+
+async def gpt_dialogs_put(dialogs: dict[int, tuple[list, str]]) -> None:
+    """Insert or replace turns and summaries of several chats in one round trip."""
+    if pool is None or not dialogs:
+        return
+    await pool.executemany(
+        """
+        INSERT INTO gpt_dialogs (chat_id, turns, summary, updated_at)
+        VALUES ($1, $2::jsonb, $3, NOW())
+        ON CONFLICT (chat_id) DO UPDATE
+        SET turns = EXCLUDED.turns,
+            summary = EXCLUDED.summary,
+            updated_at = EXCLUDED.updated_at
+        """,
+        [
+            (chat_id, json.dumps(turns, ensure_ascii=False), summary)
+            for chat_id, (turns, summary) in dialogs.items()
+        ],
+    )
+
+
 # ниже — новые хелперы для команды /done
 
 
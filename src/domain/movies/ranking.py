@@ -0,0 +1,121 @@
+"""Ranking of TMDb candidates for /add.
+
+Every candidate is reduced once to a slotted feature record (lowercased
+titles and distance to the requested year); the batch is then scored in a
+single pass with plain substring checks. The same record orders the
+year-picker options in /add.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Optional
+
+import roman
+
+if TYPE_CHECKING:
+    from src.clients.tmdb import Candidate
+
+PART_KEYWORDS = frozenset(
+    {
+        "part",
+        "chapter",
+        "volume",
+        "season",
+        "сезон",
+        "фильм",
+        "film",
+    }
+)
+
+ROMANS = ("i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x")
+
+# дефис -> пробел, кавычки удаляем; один проход str.translate вместо нескольких re.sub
+_NORM_TABLE = str.maketrans({"-": " ", **{q: None for q in '"\'«»“”„'}})
+
+
+@lru_cache(maxsize=256)
+def parse_part_token(token: str) -> Optional[int]:
+    """Arabic or roman part number, None if the token is neither."""
+    if token.isdigit():
+        return int(token)
+    try:
+        return roman.fromRoman(token.upper())
+    except roman.InvalidRomanNumeralError:
+        return None
+
+
+def norm_title(title: str) -> str:
+    return _norm_lower(title.lower())
+
+
+def _norm_lower(text: str) -> str:
+    tokens = text.translate(_NORM_TABLE).split()
+    if (
+        len(tokens) >= 2
+        and tokens[-2] in PART_KEYWORDS
+        and parse_part_token(tokens[-1]) is not None
+    ):
+        tokens = tokens[:-2]
+    return " ".join(tokens)
+
+
+def part_needles(part: int) -> tuple[str, ...]:
+    """Substrings that mark ``part`` in a lowercased title.
+
+    "part N", "chapter N" and "volume N" always contain the bare number, so
+    checking the arabic and roman forms alone gives the same answer.
+    """
+    arabic = str(part)
+    roman_num = ROMANS[part - 1] if 0 < part <= len(ROMANS) else ""
+    return tuple(n for n in (arabic, roman_num) if n)
+
+
+@dataclass(slots=True)
+class CandidateFeatures:
+    lower_local: str
+    lower_orig: str
+    year_delta: Optional[int]
+
+
+def features(cand: "Candidate", user_year: Optional[int]) -> CandidateFeatures:
+    return CandidateFeatures(
+        lower_local=cand.title_localized.lower(),
+        lower_orig=cand.original_title.lower(),
+        year_delta=(
+            abs(cand.release_year - user_year)
+            if user_year and cand.release_year is not None
+            else None
+        ),
+    )
+
+
+def closest_year_key(cand: "Candidate") -> tuple:
+    """Sort key: nearest to the requested year first, unknown years last, then by score."""
+    delta = cand.features.year_delta if cand.features is not None else None
+    return (delta is None, delta or 0, -cand.score)
+
+
+def score_batch(
+    cands: list["Candidate"],
+    user_year: Optional[int],
+    part_hint: Optional[int],
+    query: Optional[str],
+) -> list["Candidate"]:
+    """Score candidates in place, attach their features and sort by score."""
+    needles = part_needles(part_hint) if part_hint else ()
+    query_lower = query.lower() if query else None
+    for cand in cands:
+        f = features(cand, user_year)
+        cand.features = f
+        score = cand.popularity
+        if user_year and cand.release_year == user_year:
+            score *= 1.1
+        if needles and any(n in f.lower_local or n in f.lower_orig for n in needles):
+            score *= 1.2
+        if query_lower and (f.lower_local == query_lower or f.lower_orig == query_lower):
+            score *= 1.1
+        cand.score = score
+    cands.sort(key=lambda c: c.score, reverse=True)
+    return cands
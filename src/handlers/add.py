@@ -1,11 +1,9 @@
 import logging
 import time
 import uuid
-import re
 from typing import Optional
 
 from cachetools import TTLCache
-import roman
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
@@ -13,6 +11,12 @@ from telegram.ext import ContextTypes
 from src.core import db
 from src.core.config import config
 from src.core.db import DuplicateTmdbError
+from src.domain.movies.ranking import (
+    PART_KEYWORDS,
+    closest_year_key,
+    norm_title,
+    parse_part_token,
+)
 from src.clients.tmdb import (
     TMDbAuthError,
     TMDbError,
@@ -32,16 +36,6 @@ _pending: TTLCache = TTLCache(maxsize=100, ttl=config.ADD_PENDING_TTL)
 
 
 
-PART_KEYWORDS = {
-    "part",
-    "chapter",
-    "volume",
-    "season",
-    "сезон",
-    "фильм",
-    "film",
-}
-
 EMOJI_NUM = {
     1: "1️⃣",
     2: "2️⃣",
@@ -56,43 +50,10 @@ EMOJI_NUM = {
 }
 
 
-def _extract_part_from_title(title: str) -> Optional[int]:
-    pattern = r"(?i)(?:part|chapter|volume|season|сезон|фильм|film)\s*([ivxlcdm]+|\d+)\b"
-    m = re.search(pattern, title)
-    if not m:
-        return None
-    token = m.group(1)
-    if token.isdigit():
-        return int(token)
-    try:
-        return roman.fromRoman(token.upper())
-    except roman.InvalidRomanNumeralError:
-        return None
-
-
 def _part_emoji(num: Optional[int]) -> str:
     return EMOJI_NUM.get(num or 0, "")
 
 
-def _norm_title(title: str) -> str:
-    text = title.lower()
-    text = text.replace("-", " ")
-    text = re.sub(r'["\'«»“”„]', "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    tokens = text.split()
-    if len(tokens) >= 2 and tokens[-2] in PART_KEYWORDS:
-        last = tokens[-1]
-        if last.isdigit():
-            tokens = tokens[:-2]
-        else:
-            try:
-                roman.fromRoman(last.upper())
-                tokens = tokens[:-2]
-            except roman.InvalidRomanNumeralError:
-                pass
-    return " ".join(tokens)
-
-
 class YearError(Exception):
     pass
 
@@ -112,15 +73,9 @@ def _parse(args: list[str]) -> tuple[str, int, Optional[int]]:
         prev = tokens[-2].lower()
         token = tokens[-1]
         if prev in PART_KEYWORDS:
-            if token.isdigit():
-                part_hint = int(token)
+            part_hint = parse_part_token(token)
+            if part_hint is not None:
                 tokens = tokens[:-2]
-            else:
-                try:
-                    part_hint = roman.fromRoman(token.upper())
-                    tokens = tokens[:-2]
-                except roman.InvalidRomanNumeralError:
-                    pass
     title = " ".join(tokens).strip()
     if len(title) < 2:
         raise ValueError
@@ -247,11 +202,7 @@ async def add_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             await update.message.reply_text(t("not_found", lang=lang))
             return
 
-        q_norm = _norm_title(query_title)
-        for c in candidates:
-            c.part_num = _extract_part_from_title(c.title_localized) or _extract_part_from_title(c.original_title)
-            c.norm_local = _norm_title(c.title_localized)
-            c.norm_orig = _norm_title(c.original_title)
+        q_norm = norm_title(query_title)
 
         top1 = candidates[0]
         top2_score = candidates[1].score if len(candidates) > 1 else None
@@ -349,26 +300,12 @@ async def add_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
                     prev = unique_parts.get(p.tmdb_id)
                     if not prev or prev.score < p.score:
                         unique_parts[p.tmdb_id] = p
-                parts = sorted(
-                    unique_parts.values(),
-                    key=lambda c: (
-                        c.release_year is None,
-                        abs((c.release_year or 0) - user_year),
-                        -c.score,
-                    ),
-                )
+                parts = sorted(unique_parts.values(), key=closest_year_key)
                 options = parts[:5]
                 text = t("series_prompt", lang=lang, base_title=q_norm)
                 reason = "collection"
             else:
-                options = sorted(
-                    candidates,
-                    key=lambda c: (
-                        c.release_year is None,
-                        abs((c.release_year or 0) - user_year),
-                        -c.score,
-                    ),
-                )[:5]
+                options = sorted(candidates, key=closest_year_key)[:5]
                 text = t("year_prompt", lang=lang, user_year=user_year)
                 reason = "no_exact_year"
 
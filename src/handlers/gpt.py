@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import time
 import uuid
@@ -9,13 +10,16 @@ from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
 from src.core.config import config
-from src.clients.gpt import ask_groq, ask_openai
+from src.clients.gpt import stream_groq, stream_openai
+from src.services import llm, prompt_budget, summarizer
+from src.services.chat_queue import chat_queue
+from src.services.dialog_store import dialog_store
+from src.services.scheduler import SchedulerBusy, scheduler
+from src.services.stream_reply import StreamingReply
 from src.utils.format import as_html
-from src.utils.text import chunk_text
+from src.utils.text import chunk_text, mask
 
 
-_dialogs: dict[int, list[tuple[str, str]]] = {}
-
 # порядок важен: двойная точка должна проверяться раньше одинарной
 PREFIXES = [
     ("..", ("openai", "GPT-4o")),
@@ -43,18 +47,60 @@ def _is_mention_addressed(raw: str, bot_username: str | None) -> tuple[bool, str
     return False, raw
 
 
-def _model_and_tokens(provider: str) -> tuple[str, int]:
-    p = (provider or "").lower()
-    # OpenAI
-    if p in {"openai", "gpt"}:
-        return config.MODEL_OPENAI, config.MAX_TOKENS_OPENAI
-    # Groq и "ddot"-персона используют одну и ту же конфигурацию Groq
-    if p in {"groq", "ddot"}:
-        return config.MODEL_GROQ, config.MAX_TOKENS_GROQ
-    # Фоллбек на провайдера по умолчанию
-    if (config.DEFAULT_PROVIDER or "").lower() == "groq":
-        return config.MODEL_GROQ, config.MAX_TOKENS_GROQ
-    return config.MODEL_OPENAI, config.MAX_TOKENS_OPENAI
+BUSY_TEXT = "Сервис занят или тишина от модели. Попробуй ещё раз позже."
+SUPERSEDED_TEXT = "⏭ Отвечу с учётом следующего сообщения."
+INTERRUPTED_TEXT = "\n\n⚠️ Ответ оборвался, попробуй ещё раз."
+
+
+async def _stream_answer(
+    update: Update,
+    provider: str,
+    messages: list[dict],
+    max_tokens: int,
+    flow: tuple,
+    rid: str,
+    t0: float,
+) -> str:
+    """Stream the reply into progressively edited messages; return the full text.
+
+    An interrupted stream returns "": the partial text stays visible in the
+    chat but is not cached, remembered or counted as a success.
+    """
+    stream = stream_groq if provider == "groq" else stream_openai
+    reply = StreamingReply(
+        update.message,
+        interval=config.GPT_STREAM_EDIT_INTERVAL_MS / 1000,
+        limit=config.MAX_REPLY_CHARS,
+    )
+    await reply.start()
+    try:
+        async with scheduler.slot(provider, flow, llm.request_cost(messages, max_tokens)):
+            async for delta in stream(**llm.build_request(provider, messages, max_tokens)):
+                await reply.feed(delta)
+    except SchedulerBusy:
+        logging.warning("rid=%s %s queue is full", rid, provider)
+        await reply.finish(fallback=BUSY_TEXT)
+        raise
+    except asyncio.CancelledError:
+        # пришло новое сообщение — закрываем заглушку и уступаем очередь
+        await reply.finish(fallback=SUPERSEDED_TEXT)
+        raise
+    except Exception as e:
+        logging.error("rid=%s stream error %s", rid, mask(repr(e)))
+        if reply.text:
+            await reply.feed(INTERRUPTED_TEXT)
+        await reply.finish(fallback=BUSY_TEXT)
+        return ""
+    answer = reply.text
+    await reply.finish(fallback=BUSY_TEXT)
+    logging.info(
+        "rid=%s done stream in=%.2fs first_token=%.2fs answer_len=%d",
+        rid,
+        time.time() - t0,
+        reply.time_to_first_token,
+        len(answer),
+    )
+    return answer
 
 
 async def start_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -112,108 +158,106 @@ async def gpt_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             )
             return
 
-        model, max_tokens = _model_and_tokens(provider)
+        if provider not in llm.PROVIDERS:
+            provider = "groq"
+        if not llm.api_key(provider):
+            await update.message.reply_text(f"{provider.upper()}_API_KEY не задан")
+            return
+
+        user_id = update.effective_user.id if update.effective_user else 0
+
+        async def run(text: str) -> None:
+            await _answer(update, context, provider, text, user_id, rid, t0)
+
+        # ответ готовится в фоне: обработчик не держит очередь апдейтов, пока модель думает
+        chat_queue.submit(chat_id, user_id, clean_text, run)
+
+    except Exception as e:
+        logging.exception("rid=%s gpt_handler error: %s", rid, e)
+        try:
+            await update.message.reply_text(
+                "⚠️ Произошла ошибка. Попробуй ещё раз, я уже смотрю логи."
+            )
+        except Exception:
+            pass
+
+
+async def _answer(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    provider: str,
+    clean_text: str,
+    user_id: int,
+    rid: str,
+    t0: float,
+) -> None:
+    """Build the prompt from chat history and reply; runs in the chat's queue slot."""
+    chat_id = update.effective_chat.id
+    try:
+        model, _ = llm.model_and_tokens(provider)
 
         await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.TYPING)
 
         # --- История в prompt, без дублирования ---
-        history = _dialogs.get(chat_id, [])
-        # последние N пар (role, content)
-        hist_pairs = history[-config.DIALOG_HISTORY_LEN :]
-
-        # Представляем историю как "role: content"
-        def _build_prompt(pairs: list[tuple[str, str]]) -> str:
-            msgs = [f"{role}: {content}" for role, content in pairs]
-            msgs.append(f"user: {clean_text}")
-            return "\n".join(msgs)
-
-        prompt = _build_prompt(hist_pairs)
-
-        # Обрезаем самую старую историю, если слишком длинно по символам
-        while len(prompt) > config.MAX_PROMPT_CHARS and hist_pairs:
-            hist_pairs = hist_pairs[1:]  # выбрасываем старую реплику
-            prompt = _build_prompt(hist_pairs)
-
-        # Если даже без истории слишком длинно — подрежем текущий вопрос
-        if len(prompt) > config.MAX_PROMPT_CHARS:
-            overflow = len(prompt) - config.MAX_PROMPT_CHARS
-            clean_text_trimmed = (
-                clean_text[:-overflow] if overflow < len(clean_text) else clean_text[:1]
-            )
-            prompt = "\n".join(
-                [f"{role}: {content}" for role, content in hist_pairs]
-                + [f"user: {clean_text_trimmed}"]
-            )
+        history = await dialog_store.get(chat_id)
+        if not summarizer.enabled():
+            history = history[-config.DIALOG_HISTORY_LEN :]
+        # реплики (и конспект старых), обрезанные по бюджету токенов модели
+        budget = prompt_budget.plan(
+            provider, history, clean_text, dialog_store.summary(chat_id)
+        )
+        messages = budget.messages
 
-        logging.info("rid=%s start model=%s prompt_len=%d", rid, model, len(prompt))
-        if provider not in {"groq", "openai"}:
-            provider = "groq"
-        if provider == "groq":
-            if not config.GROQ_API_KEY:
-                await update.message.reply_text("GROQ_API_KEY не задан")
-                return
-            system = (
-                "Ты дерзкий приколист без цензуры. Общайся грубовато, можешь использовать мат и подколы, "
-                "но при этом отвечай по делу. Если к тебе обращаются грубо — отвечай тем же, "
-                "чтобы поставить собеседника на место. В спокойных ситуациях — шути, подкалывай, "
-                "разговаривай как 'свой пацан'. Не будь слишком официальным."
-            )
-            answer = await ask_groq(
-                api_token=config.GROQ_API_KEY,
-                model=model,
-                system=system,
-                prompt=prompt,
-                max_tokens=max_tokens,
-                timeout=30,
-            )
-        elif provider == "openai":
-            if not config.OPENAI_API_KEY:
-                await update.message.reply_text("OPENAI_API_KEY не задан")
+        logging.info(
+            "rid=%s start model=%s prompt_tokens~%d max_tokens=%d dropped=%d",
+            rid,
+            model,
+            budget.prompt_tokens,
+            budget.max_tokens,
+            budget.dropped,
+        )
+        # один поиск в кэше на запрос: повторный исказил бы hits и saved_*
+        cached = llm.cache_lookup(provider, messages, chat_id)
+        if cached is None and config.GPT_STREAM and not llm.circuit_open(provider):
+            # хеджирование к потоковому режиму не применяется: ответ уже виден по мере генерации
+            try:
+                answer = await llm.guarded(
+                    provider,
+                    lambda: _stream_answer(
+                        update,
+                        provider,
+                        messages,
+                        budget.max_tokens,
+                        (chat_id, user_id),
+                        rid,
+                        t0,
+                    ),
+                )
+            except SchedulerBusy:
+                return  # заглушка уже сообщила, что сервис занят
+            if answer is not None:
+                if answer:
+                    llm.cache_store(provider, messages, chat_id, answer, time.time() - t0)
+                    await dialog_store.append(chat_id, clean_text, answer)
+                    summarizer.maybe_compact(chat_id)
                 return
-            system = (
-                "Ты дружеский собеседник. Общайся непринуждённо, простыми словами, без сухого академизма. "
-                "Можешь иногда слегка подколоть или пошутить, но оставайся в целом доброжелательным и позитивным. "
-                "Не используй матерные слова, максимум лёгкий стёб."
-            )
-            answer = await ask_openai(
-                api_token=config.OPENAI_API_KEY,
-                model=model,
-                system=system,
-                prompt=prompt,
-                max_tokens=max_tokens,
-                timeout=30,
-            )
+            # автомат защиты только что открылся — обычный запрос переключится на второго
+
+        if cached is not None:
+            answer, answered_by = cached, provider
         else:
-            # страховка, если в провайдер попало что-то неизвестное
-            if not config.GROQ_API_KEY:
-                await update.message.reply_text("GROQ_API_KEY не задан")
-                return
-            system = (
-                "Ты дерзкий приколист без цензуры. Общайся грубовато, можешь использовать мат и подколы, "
-                "но при этом отвечай по делу. Если к тебе обращаются грубо — отвечай тем же, "
-                "чтобы поставить собеседника на место. В спокойных ситуациях — шути, подкалывай, "
-                "разговаривай как 'свой пацан'. Не будь слишком официальным."
-            )
-            answer = await ask_groq(
-                api_token=config.GROQ_API_KEY,
-                model=model,
-                system=system,
-                prompt=prompt,
-                max_tokens=max_tokens,
-                timeout=30,
+            answer, answered_by = await llm.ask(
+                provider, messages, chat_id, budget.max_tokens, user_id, lookup=False
             )
+        if answered_by != provider:
+            logging.info("rid=%s answered by %s instead of %s", rid, answered_by, provider)
 
         if not answer:
-            await update.message.reply_text(
-                "Сервис занят или тишина от модели. Попробуй ещё раз позже."
-            )
+            await update.message.reply_text(BUSY_TEXT)
             return
 
-        _dialogs.setdefault(chat_id, []).append(("user", clean_text))
-        _dialogs[chat_id].append(("assistant", answer))
-        # держим не более N пар (user/assistant) * 1:1
-        if len(_dialogs[chat_id]) > config.DIALOG_HISTORY_LEN * 2:
-            _dialogs[chat_id] = _dialogs[chat_id][-config.DIALOG_HISTORY_LEN * 2 :]
+        await dialog_store.append(chat_id, clean_text, answer)
+        summarizer.maybe_compact(chat_id)
 
         chunks = chunk_text(answer, config.MAX_REPLY_CHARS)
         if not chunks:
@@ -236,9 +280,8 @@ async def gpt_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
             len(answer),
             len(chunks),
         )
-
     except Exception as e:
-        logging.exception("rid=%s gpt_handler error: %s", rid, e)
+        logging.exception("rid=%s gpt answer error: %s", rid, e)
         try:
             await update.message.reply_text(
                 "⚠️ Произошла ошибка. Попробуй ещё раз, я уже смотрю логи."
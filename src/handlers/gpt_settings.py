@@ -0,0 +1,29 @@
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from src.services import chat_settings
+
+_ON = {"on", "1", "true", "yes", "вкл"}
+_OFF = {"off", "0", "false", "no", "выкл"}
+
+
+def _usage(chat_id: int) -> str:
+    lines = ["Использование: /gptset <опция> on|off"]
+    for name, (default, description) in chat_settings.OPTIONS.items():
+        value = chat_settings.get_option(chat_id, name, default)
+        lines.append(f"• {name} — {description} (сейчас: {'on' if value else 'off'})")
+    return "\n".join(lines)
+
+
+async def gptset_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Обрабатывает команду /gptset: включает и выключает опции GPT для чата."""
+    if not update.message:
+        return
+    chat_id = update.effective_chat.id
+    args = [a.lower() for a in context.args or []]
+    if len(args) != 2 or args[0] not in chat_settings.OPTIONS or args[1] not in _ON | _OFF:
+        await update.message.reply_text(_usage(chat_id))
+        return
+    option, value = args[0], args[1] in _ON
+    chat_settings.set_option(chat_id, option, value)
+    await update.message.reply_text(f"Готово: {option} — {'on' if value else 'off'}")
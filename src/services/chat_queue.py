@@ -0,0 +1,118 @@
+"""Очередь GPT-запросов по чатам: последовательное выполнение, склейка и отмена.
+
+Запросы одного чата выполняются строго по очереди, поэтому история диалога
+пишется в том же порядке, в котором пришли сообщения. Дополнительно:
+
+* ``GPT_DEBOUNCE_MS`` — сообщения одного пользователя, пришедшие подряд в
+  пределах окна, склеиваются в один промпт;
+* ``GPT_CANCEL_SUPERSEDED`` — новое сообщение отменяет ещё не законченный
+  ответ тому же пользователю, а его текст уходит в следующий промпт.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+from src.core.config import config
+from src.utils.keyed_lock import KeyedLock
+
+Runner = Callable[[str], Awaitable[None]]
+
+
+@dataclass
+class _Pending:
+    texts: list[str] = field(default_factory=list)  # ещё не отвеченные сообщения
+    run: Optional[Runner] = None  # обработчик самого свежего сообщения
+    generation: int = 0
+    task: Optional[asyncio.Task] = None
+
+
+class ChatQueue:
+    """Serialize GPT work per chat; optionally coalesce and cancel per user."""
+
+    def __init__(self) -> None:
+        self._locks = KeyedLock()
+        self._pending: dict[tuple[int, int], _Pending] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.submitted = 0
+        self.merged = 0
+        self.cancelled = 0
+
+    @staticmethod
+    def _coalescing() -> bool:
+        return config.GPT_DEBOUNCE_MS > 0 or config.GPT_CANCEL_SUPERSEDED
+
+    def submit(self, chat_id: int, user_id: int, text: str, run: Runner) -> None:
+        """Queue ``text`` from ``user_id``; ``run(prompt_text)`` answers it later."""
+        self.submitted += 1
+        if not self._coalescing():
+            self._spawn(self._serial(chat_id, text, run))
+            return
+
+        key = (chat_id, user_id)
+        p = self._pending.setdefault(key, _Pending())
+        p.texts.append(text)
+        p.run = run
+        p.generation += 1
+        if p.task is not None and not p.task.done() and config.GPT_CANCEL_SUPERSEDED:
+            self.cancelled += 1
+            p.task.cancel()
+        p.task = self._spawn(self._coalesced(key, p, p.generation))
+
+    def _spawn(self, coro: Awaitable[None]) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _locked(self, chat_id: int, fn: Callable[[], Awaitable[None]]) -> None:
+        async with self._locks.hold(chat_id):
+            await fn()
+
+    async def _serial(self, chat_id: int, text: str, run: Runner) -> None:
+        await self._locked(chat_id, lambda: run(text))
+
+    async def _coalesced(self, key: tuple[int, int], p: _Pending, generation: int) -> None:
+        if config.GPT_DEBOUNCE_MS > 0:
+            await asyncio.sleep(config.GPT_DEBOUNCE_MS / 1000)
+
+        async def answer() -> None:
+            if p.generation != generation or not p.texts:
+                return  # пришло сообщение новее — ответит его задача
+            texts = list(p.texts)
+            superseded = False
+            try:
+                await p.run("\n".join(texts))
+            except asyncio.CancelledError:
+                superseded = True  # отменённый запрос оставляет тексты следующему
+                raise
+            finally:
+                if not superseded:
+                    self.merged += len(texts) - 1
+                    del p.texts[: len(texts)]
+
+        try:
+            await self._locked(key[0], answer)
+        finally:
+            if not p.texts and self._pending.get(key) is p and p.generation == generation:
+                del self._pending[key]
+
+    async def aclose(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        logging.info("chat queue closed")
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "cancelled": self.cancelled,
+            "pending": sum(len(p.texts) for p in self._pending.values()),
+            "busy_chats": len(self._locks),
+        }
+
+
+chat_queue = ChatQueue()
@@ -0,0 +1,19 @@
+"""Настройки GPT на уровне чата (в памяти процесса)."""
+
+from typing import Any
+
+# опция -> (значение по умолчанию, описание для /gptset)
+OPTIONS: dict[str, tuple[bool, str]] = {
+    "hedge": (True, "дублировать медленный запрос другому провайдеру"),
+    "cache": (True, "отвечать из кэша на повтор точно такого же вопроса"),
+}
+
+_settings: dict[int, dict[str, Any]] = {}
+
+
+def get_option(chat_id: int, option: str, default: Any = None) -> Any:
+    return _settings.get(chat_id, {}).get(option, default)
+
+
+def set_option(chat_id: int, option: str, value: Any) -> None:
+    _settings.setdefault(chat_id, {})[option] = value
@@ -0,0 +1,229 @@
+"""История GPT-диалогов с ограничением памяти и отложенной записью в Postgres.
+
+Каждый чат — deque фиксированной длины. Общее число чатов и суммарный
+размер истории ограничены; при переполнении вытесняются чаты, к которым
+дольше всего не обращались. С ``GPT_DIALOG_PERSIST=true`` изменённые чаты
+периодически сбрасываются в таблицу ``gpt_dialogs`` и подгружаются оттуда
+после рестарта или вытеснения.
+
+Кроме реплик у чата может быть краткое содержание старой части разговора
+(см. ``src.services.summarizer``).
+"""
+
+import logging
+import sys
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Optional
+
+from telegram.ext import ContextTypes, JobQueue
+
+from src.core import db
+from src.core.config import config
+from src.services.prompt_budget import Turn, make_turn
+
+_JOB_NAME = "flush_dialogs"
+# кортеж (role, content, tokens) и ссылки на него в deque
+_TURN_OVERHEAD = sys.getsizeof((None, None, 0)) + sys.getsizeof(0) + 8
+
+
+def _turn_size(turn: Turn) -> int:
+    return _TURN_OVERHEAD + sys.getsizeof(turn[1])
+
+
+@dataclass(slots=True)
+class _Chat:
+    turns: deque[Turn]
+    summary: str = ""
+
+    def size(self) -> int:
+        return sum(_turn_size(t) for t in self.turns) + (
+            sys.getsizeof(self.summary) if self.summary else 0
+        )
+
+    def dump(self) -> tuple[list, str]:
+        return [list(t) for t in self.turns], self.summary
+
+
+class DialogStore:
+    """Per-chat bounded history with global chat/byte caps and LRU eviction."""
+
+    def __init__(self, turns_per_chat: int, max_chats: int, max_bytes: int, persist: bool):
+        self.turns_per_chat = turns_per_chat
+        self.max_chats = max_chats
+        self.max_bytes = max_bytes
+        self.persist = persist
+        self._chats: OrderedDict[int, _Chat] = OrderedDict()
+        self._bytes = 0
+        self._dirty: set[int] = set()
+        # вытеснены, но ещё не записаны; их размер остаётся в _bytes до записи
+        self._unflushed: dict[int, _Chat] = {}
+        self.evicted = 0
+        self.dropped = 0
+        self.loads = 0
+        self.flushed = 0
+
+    async def get(self, chat_id: int) -> list[Turn]:
+        """History of ``chat_id``, oldest first; loads it from Postgres if needed."""
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._attach(chat_id, await self._load(chat_id))
+        else:
+            self._chats.move_to_end(chat_id)
+        return list(chat.turns)
+
+    def summary(self, chat_id: int) -> str:
+        """Summary of turns already compacted away (empty if none)."""
+        chat = self._chats.get(chat_id)
+        return chat.summary if chat is not None else ""
+
+    async def append(self, chat_id: int, question: str, answer: str) -> None:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            # чат могли вытеснить, пока модель отвечала, — не затираем сохранённую историю
+            chat = self._attach(chat_id, await self._load(chat_id))
+        self._chats.move_to_end(chat_id)
+        turns = chat.turns
+        for turn in (make_turn("user", question), make_turn("assistant", answer)):
+            if len(turns) == turns.maxlen:
+                self._bytes -= _turn_size(turns[0])
+            turns.append(turn)
+            self._bytes += _turn_size(turn)
+        if self.persist:
+            self._dirty.add(chat_id)
+        self._evict(keep=chat_id)
+
+    def older_than(self, chat_id: int, keep: int) -> list[Turn]:
+        """Turns of ``chat_id`` except the newest ``keep``."""
+        chat = self._chats.get(chat_id)
+        if chat is None or len(chat.turns) <= keep:
+            return []
+        return list(chat.turns)[: len(chat.turns) - keep]
+
+    def compact(self, chat_id: int, turns: list[Turn], summary: str) -> bool:
+        """Replace ``turns`` (the oldest ones, as returned by ``older_than``) with ``summary``."""
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            return False
+        self._bytes -= chat.size()
+        # пока шло сжатие, часть этих реплик могла уйти из deque сама — снимаем только совпадающие
+        pending = {id(t) for t in turns}
+        while chat.turns and id(chat.turns[0]) in pending:
+            chat.turns.popleft()
+        chat.summary = summary
+        self._bytes += chat.size()
+        if self.persist:
+            self._dirty.add(chat_id)
+        return True
+
+    def _attach(self, chat_id: int, chat: _Chat) -> _Chat:
+        self._chats[chat_id] = chat
+        self._bytes += chat.size()
+        self._evict(keep=chat_id)
+        return chat
+
+    def _new_chat(self, turns: list[Turn] = (), summary: str = "") -> _Chat:
+        return _Chat(deque(turns, maxlen=self.turns_per_chat), summary)
+
+    def _evict(self, keep: Optional[int]) -> None:
+        while len(self._chats) > self.max_chats or self._bytes > self.max_bytes:
+            chat_id = next((c for c in self._chats if c != keep), None)
+            if chat_id is not None:
+                chat = self._chats.pop(chat_id)
+                self.evicted += 1
+                if chat_id in self._dirty:
+                    self._dirty.discard(chat_id)
+                    self._unflushed[chat_id] = chat
+                else:
+                    self._bytes -= chat.size()
+                continue
+            if self._bytes > self.max_bytes and self._unflushed:
+                # Postgres не успевает или недоступен — лимит памяти важнее несохранённой истории
+                chat_id = next(iter(self._unflushed))
+                self._bytes -= self._unflushed.pop(chat_id).size()
+                self.dropped += 1
+                logging.warning("dialog store full, unsaved history dropped chat=%s", chat_id)
+                continue
+            break  # остался один чат больше лимита — держим, deque всё равно ограничен
+
+    async def _load(self, chat_id: int) -> _Chat:
+        if chat_id in self._unflushed:
+            # ещё не записан — снова помечаем, иначе после возврата flush его не увидит
+            self._dirty.add(chat_id)
+            chat = self._unflushed.pop(chat_id)
+            self._bytes -= chat.size()  # _attach посчитает его снова
+            return chat
+        if not self.persist:
+            return self._new_chat()
+        try:
+            row = await db.gpt_dialog_get(chat_id)
+        except Exception as e:
+            logging.warning("dialog load failed chat=%s: %s", chat_id, e)
+            return self._new_chat()
+        if row is None:
+            return self._new_chat()
+        self.loads += 1
+        rows, summary = row
+        turns = [(role, content, int(tokens)) for role, content, tokens in rows]
+        return self._new_chat(turns, summary)
+
+    async def flush(self) -> None:
+        """Write changed chats to Postgres."""
+        if not self.persist or not (self._dirty or self._unflushed):
+            return
+        chats = dict(self._unflushed)
+        chats.update({chat_id: self._chats[chat_id] for chat_id in self._dirty})
+        self._bytes -= sum(chat.size() for chat in self._unflushed.values())
+        self._dirty.clear()
+        self._unflushed.clear()
+        batch = {chat_id: chat.dump() for chat_id, chat in chats.items()}
+        try:
+            await db.gpt_dialogs_put(batch)
+            self.flushed += len(batch)
+        except Exception as e:
+            logging.warning("dialog flush failed (%d chats): %s", len(batch), e)
+            # не потеряем: допишем в следующий раз, если чат не изменится раньше
+            for chat_id, chat in chats.items():
+                if chat_id in self._chats:
+                    self._dirty.add(chat_id)
+                elif chat_id not in self._unflushed:
+                    self._unflushed[chat_id] = chat
+                    self._bytes += chat.size()
+            self._evict(keep=None)
+
+    def schedule(self, job_queue: JobQueue | None) -> None:
+        """Flush every ``GPT_DIALOG_FLUSH_INTERVAL`` seconds."""
+        if not job_queue or not self.persist:
+            return
+        job_queue.run_repeating(
+            _flush_job,
+            interval=config.GPT_DIALOG_FLUSH_INTERVAL,
+            first=config.GPT_DIALOG_FLUSH_INTERVAL,
+            name=_JOB_NAME,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "chats": len(self._chats),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "evicted": self.evicted,
+            "dirty": len(self._dirty),
+            "unflushed": len(self._unflushed),
+            "unflushed_bytes": sum(chat.size() for chat in self._unflushed.values()),
+            "dropped": self.dropped,
+            "loads": self.loads,
+            "flushed": self.flushed,
+        }
+
+
+async def _flush_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    await dialog_store.flush()
+
+
+dialog_store = DialogStore(
+    turns_per_chat=config.DIALOG_HISTORY_LEN * 2,
+    max_chats=config.GPT_DIALOG_MAX_CHATS,
+    max_bytes=config.GPT_DIALOG_MAX_MB * 1024 * 1024,
+    persist=config.GPT_DIALOG_PERSIST,
+)
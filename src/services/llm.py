@@ -0,0 +1,320 @@
+"""Вызов LLM-провайдеров: персоны, лимиты, хеджирование и автоматы защиты."""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from src.clients.gpt import ask_groq, ask_openai, retry_stats, usage_stats
+from src.core.config import config
+from src.services import chat_settings
+from src.services.scheduler import SchedulerBusy, scheduler
+from src.utils.cache import MeteredTTLCache
+from src.utils.circuit import CircuitBreaker
+from src.utils.percentile import percentile
+
+PROVIDERS = ("groq", "openai")
+
+SYSTEM_PROMPTS = {
+    "groq": (
+        "Ты дерзкий приколист без цензуры. Общайся грубовато, можешь использовать мат и подколы, "
+        "но при этом отвечай по делу. Если к тебе обращаются грубо — отвечай тем же, "
+        "чтобы поставить собеседника на место. В спокойных ситуациях — шути, подкалывай, "
+        "разговаривай как 'свой пацан'. Не будь слишком официальным."
+    ),
+    "openai": (
+        "Ты дружеский собеседник. Общайся непринуждённо, простыми словами, без сухого академизма. "
+        "Можешь иногда слегка подколоть или пошутить, но оставайся в целом доброжелательным и позитивным. "
+        "Не используй матерные слова, максимум лёгкий стёб."
+    ),
+}
+
+
+def model_and_tokens(provider: str) -> tuple[str, int]:
+    p = (provider or "").lower()
+    # OpenAI
+    if p in {"openai", "gpt"}:
+        return config.MODEL_OPENAI, config.MAX_TOKENS_OPENAI
+    # Groq и "ddot"-персона используют одну и ту же конфигурацию Groq
+    if p in {"groq", "ddot"}:
+        return config.MODEL_GROQ, config.MAX_TOKENS_GROQ
+    # Фоллбек на провайдера по умолчанию
+    if (config.DEFAULT_PROVIDER or "").lower() == "groq":
+        return config.MODEL_GROQ, config.MAX_TOKENS_GROQ
+    return config.MODEL_OPENAI, config.MAX_TOKENS_OPENAI
+
+
+def context_tokens(provider: str) -> int:
+    """Token budget for one request (prompt plus reply) to ``provider``."""
+    if provider == "groq":
+        return config.GPT_CONTEXT_TOKENS_GROQ
+    return config.GPT_CONTEXT_TOKENS_OPENAI
+
+
+def api_key(provider: str) -> Optional[str]:
+    return config.GROQ_API_KEY if provider == "groq" else config.OPENAI_API_KEY
+
+
+def other(provider: str) -> str:
+    return "openai" if provider == "groq" else "groq"
+
+
+def build_request(
+    provider: str, messages: list[dict], max_tokens: Optional[int] = None
+) -> dict:
+    """Keyword arguments for ask_*/stream_* with the provider's own persona and limits.
+
+    ``max_tokens`` from the prompt budget is capped by the provider's own limit.
+    """
+    model, cap = model_and_tokens(provider)
+    return dict(
+        api_token=api_key(provider),
+        model=model,
+        system=SYSTEM_PROMPTS[provider],
+        messages=messages,
+        max_tokens=min(max_tokens or cap, cap),
+        timeout=config.GPT_HTTP_TIMEOUT,
+    )
+
+
+class LatencyTracker:
+    """Rolling window of call latencies (cancelled calls count as lower bounds)."""
+
+    def __init__(self, size: int):
+        self._samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if len(self._samples) < config.GPT_HEDGE_MIN_SAMPLES:
+            return None
+        return percentile(sorted(self._samples), p)
+
+    def stats(self) -> dict:
+        return {
+            "samples": len(self._samples),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+        }
+
+
+_latency = {p: LatencyTracker(config.GPT_HEDGE_WINDOW) for p in PROVIDERS}
+_counters = {"hedged": 0, "hedge_wins": 0, "failovers": 0, "rejected": 0}
+_breakers = {
+    p: CircuitBreaker(config.GPT_BREAKER_THRESHOLD, config.GPT_BREAKER_RESET)
+    for p in PROVIDERS
+}
+
+
+def request_cost(messages: list[dict], max_tokens: Optional[int]) -> float:
+    """Rough size of a request in tokens, used as its cost in the fair queue."""
+    return sum(len(m["content"]) for m in messages) / 4 + (max_tokens or 0)
+
+
+def circuit_open(provider: str) -> bool:
+    """True while ``provider``'s breaker refuses calls."""
+    return _breakers[provider].is_open
+
+
+async def guarded(provider: str, call: Callable[[], Awaitable[str]]) -> Optional[str]:
+    """Run ``call`` through ``provider``'s circuit breaker.
+
+    Returns None without calling when the breaker is open; an empty answer or
+    an error counts as a failure, a full queue or cancellation as neither.
+    """
+    breaker = _breakers[provider]
+    if not breaker.allow():
+        return None
+    ok: Optional[bool] = None
+    try:
+        answer = await call()
+        ok = bool(answer)
+        return answer
+    except SchedulerBusy:
+        raise
+    except Exception:
+        ok = False
+        raise
+    finally:
+        if ok is None:
+            breaker.release()
+        else:
+            breaker.record(ok)
+            if not ok and breaker.is_open:
+                logging.warning("[llm] %s circuit open", provider)
+
+
+async def _timed(
+    provider: str, messages: list[dict], max_tokens: Optional[int], flow: tuple
+) -> str:
+    ask = ask_groq if provider == "groq" else ask_openai
+
+    async def call() -> str:
+        async with scheduler.slot(provider, flow, request_cost(messages, max_tokens)):
+            # задержку меряем без ожидания в очереди: порог хеджирования — про провайдера
+            t0 = time.monotonic()
+            try:
+                answer = await ask(**build_request(provider, messages, max_tokens))
+            except asyncio.CancelledError:
+                # обогнали хеджем или отменили: прошедшее время — нижняя граница задержки,
+                # без неё медленный хвост выпадает из окна и p95 ползёт вниз
+                _latency[provider].add(time.monotonic() - t0)
+                raise
+        if answer:
+            _latency[provider].add(time.monotonic() - t0)
+        return answer
+
+    try:
+        answer = await guarded(provider, call)
+    except SchedulerBusy:
+        logging.warning("[llm] %s queue is full", provider)
+        _counters["rejected"] += 1
+        return ""
+    return answer or ""
+
+
+def hedge_delay(provider: str) -> float:
+    """Seconds to wait for ``provider`` before asking the other one: its p95."""
+    p95 = _latency[provider].percentile(95)
+    return p95 if p95 is not None else config.GPT_HEDGE_DEFAULT_DELAY_MS / 1000
+
+
+def _can_hedge(provider: str, chat_id: int) -> bool:
+    return (
+        config.GPT_HEDGE
+        and bool(api_key(other(provider)))
+        and chat_settings.get_option(chat_id, "hedge", True)
+    )
+
+
+# ключ -> (ответ, сколько секунд занял исходный запрос)
+_cache = MeteredTTLCache(maxsize=config.GPT_CACHE_SIZE, ttl=config.GPT_CACHE_TTL)
+_cache_saved = {"seconds": 0.0, "chars": 0}
+
+
+def _cache_key(provider: str, messages: list[dict]) -> str:
+    model, _ = model_and_tokens(provider)
+    normalized = "\x01".join(
+        f"{m['role']}:{' '.join(m['content'].lower().split())}" for m in messages
+    )
+    raw = "\x00".join((provider, model, SYSTEM_PROMPTS[provider], normalized))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_enabled(chat_id: int) -> bool:
+    return config.GPT_CACHE_TTL > 0 and chat_settings.get_option(chat_id, "cache", True)
+
+
+def cache_lookup(provider: str, messages: list[dict], chat_id: int) -> Optional[str]:
+    """Cached answer for exactly this provider, model, persona and messages."""
+    if not _cache_enabled(chat_id):
+        return None
+    hit = _cache.lookup(_cache_key(provider, messages))
+    if hit is None:
+        return None
+    answer, seconds = hit
+    _cache_saved["seconds"] += seconds
+    _cache_saved["chars"] += len(answer)
+    return answer
+
+
+def cache_store(
+    provider: str, messages: list[dict], chat_id: int, answer: str, seconds: float
+) -> None:
+    if answer and _cache_enabled(chat_id):
+        _cache[_cache_key(provider, messages)] = (answer, seconds)
+
+
+async def ask(
+    provider: str,
+    messages: list[dict],
+    chat_id: int,
+    max_tokens: Optional[int] = None,
+    user_id: int = 0,
+    lookup: bool = True,
+) -> tuple[str, str]:
+    """Ask ``provider`` through the response cache, hedging if enabled.
+
+    Returns ``(answer, provider that answered)``; the answer is empty on failure
+    or when the provider queues are full. ``lookup=False`` skips the cache read
+    for a caller that has already missed, so the miss is not counted twice.
+    """
+    if lookup:
+        cached = cache_lookup(provider, messages, chat_id)
+        if cached is not None:
+            return cached, provider
+    t0 = time.monotonic()
+    answer, answered_by = await _ask_hedged(
+        provider, messages, chat_id, max_tokens, (chat_id, user_id)
+    )
+    # ответ другого провайдера написан другой персоной — кладём его под ключ ответившего
+    cache_store(answered_by, messages, chat_id, answer, time.monotonic() - t0)
+    return answer, answered_by
+
+
+async def _ask_hedged(
+    provider: str,
+    messages: list[dict],
+    chat_id: int,
+    max_tokens: Optional[int],
+    flow: tuple,
+) -> tuple[str, str]:
+    """Ask ``provider``; hedge to the other provider if it is slower than its p95."""
+    if circuit_open(provider) and api_key(other(provider)):
+        # провайдер лежит — сразу идём ко второму, не дожидаясь порога
+        _counters["failovers"] += 1
+        provider = other(provider)
+        return await _timed(provider, messages, max_tokens, flow), provider
+    if not _can_hedge(provider, chat_id):
+        return await _timed(provider, messages, max_tokens, flow), provider
+
+    primary = asyncio.ensure_future(_timed(provider, messages, max_tokens, flow))
+    secondary: asyncio.Future | None = None
+    delay = hedge_delay(provider)
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done and primary.result():
+            return primary.result(), provider
+        secondary_name = other(provider)
+        if done:
+            # основной провайдер ответил ошибкой раньше порога — сразу переключаемся
+            _counters["failovers"] += 1
+            return await _timed(secondary_name, messages, max_tokens, flow), secondary_name
+
+        _counters["hedged"] += 1
+        logging.info("[llm] %s slower than %.2fs, hedging to %s", provider, delay, secondary_name)
+        secondary = asyncio.ensure_future(_timed(secondary_name, messages, max_tokens, flow))
+        names = {primary: provider, secondary: secondary_name}
+        pending = {primary, secondary}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                answer = task.result()
+                if answer:
+                    if task is secondary:
+                        _counters["hedge_wins"] += 1
+                    return answer, names[task]
+        return "", provider
+    finally:
+        for task in (primary, secondary):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+def stats() -> dict:
+    return {
+        **_counters,
+        "latency": {p: t.stats() for p, t in _latency.items()},
+        "usage": usage_stats(),
+        "retry": retry_stats(),
+        "scheduler": scheduler.stats(),
+        "circuit": {p: b.stats() for p, b in _breakers.items()},
+        "cache": {
+            **_cache.stats(),
+            "saved_seconds": round(_cache_saved["seconds"], 2),
+            "saved_chars": _cache_saved["chars"],
+        },
+    }
@@ -0,0 +1,100 @@
+"""Бюджет токенов для промпта GPT: оценка длины и обрезка истории за один проход.
+
+Промпт собирается списком сообщений в постоянном порядке — конспект, реплики,
+вопрос, — чтобы начало запроса совпадало между ходами и попадало в кэш
+промптов провайдера.
+"""
+
+from dataclasses import dataclass
+from typing import Sequence
+
+from src.core.config import config
+from src.services import llm
+
+# роль, разделители и служебные токены формата сообщения
+MESSAGE_OVERHEAD = 4
+
+# (role, content, оценка токенов строки "role: content")
+Turn = tuple[str, str, int]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about 4 bytes of UTF-8 per token (≈2 Cyrillic letters)."""
+    return len(text.encode("utf-8")) // 4 + MESSAGE_OVERHEAD
+
+
+def make_turn(role: str, content: str) -> Turn:
+    return role, content, estimate_tokens(f"{role}: {content}")
+
+
+def trim_to_tokens(text: str, prefix: str, budget: int) -> str:
+    """Cut ``text`` so that ``estimate_tokens(prefix + text)`` fits ``budget``."""
+    room = max(0, (budget - MESSAGE_OVERHEAD) * 4 + 3 - len(prefix.encode("utf-8")))
+    # режем по байтам, а не по символам: оценка считается в байтах UTF-8
+    return text.encode("utf-8")[:room].decode("utf-8", errors="ignore")
+
+
+def fit_history(history: Sequence[Turn], budget: int) -> tuple[int, int]:
+    """Index of the oldest turn that still fits ``budget`` and the tokens it takes.
+
+    Walks from the newest turn back once, so the cost is linear in history size.
+    """
+    used = 0
+    start = len(history)
+    for i in range(len(history) - 1, -1, -1):
+        tokens = history[i][2]
+        if used + tokens > budget:
+            break
+        used += tokens
+        start = i
+    return start, used
+
+
+@dataclass
+class PromptPlan:
+    messages: list[dict]
+    prompt_tokens: int
+    max_tokens: int
+    dropped: int  # сколько старых реплик не поместилось
+
+
+def plan(
+    provider: str, history: Sequence[Turn], question: str, summary: str = ""
+) -> PromptPlan:
+    """Fit summary, history and question into the provider's context budget.
+
+    The reply gets whatever is left, capped by the provider's ``MAX_TOKENS_*``;
+    room for ``GPT_MIN_REPLY_TOKENS`` is reserved up front, and the total
+    never exceeds the context window.
+    """
+    _, reply_cap = llm.model_and_tokens(provider)
+    context = llm.context_tokens(provider)
+    min_reply = min(config.GPT_MIN_REPLY_TOKENS, reply_cap)
+    system_tokens = estimate_tokens(llm.SYSTEM_PROMPTS[provider])
+    available = max(0, context - system_tokens - min_reply)
+
+    question_tokens = estimate_tokens(f"user: {question}")
+    if question_tokens > available:
+        # даже без истории не влезает — подрезаем сам вопрос и пересчитываем оценку
+        question = trim_to_tokens(question, "user: ", available) or question[:1]
+        question_tokens = estimate_tokens(f"user: {question}")
+
+    summary_text = f"Кратко о разговоре ранее: {summary}" if summary else ""
+    summary_tokens = estimate_tokens(f"system: {summary_text}") if summary_text else 0
+    if summary_tokens > available - question_tokens:
+        summary_text, summary_tokens = "", 0
+
+    start, history_tokens = fit_history(
+        history, max(0, available - question_tokens - summary_tokens)
+    )
+    messages = [{"role": "system", "content": summary_text}] if summary_text else []
+    messages += [{"role": role, "content": content} for role, content, _ in history[start:]]
+    messages.append({"role": "user", "content": question})
+
+    prompt_tokens = system_tokens + summary_tokens + history_tokens + question_tokens
+    return PromptPlan(
+        messages=messages,
+        prompt_tokens=prompt_tokens,
+        max_tokens=max(1, min(reply_cap, context - prompt_tokens)),
+        dropped=start,
+    )
@@ -0,0 +1,125 @@
+"""Глобальный планировщик запросов к LLM.
+
+У каждого провайдера ограничено число одновременных запросов
+(``GPT_CONCURRENCY_*``). Ожидающие запросы выдаются по справедливой
+очереди (start-time fair queueing): поток — пара (чат, пользователь),
+стоимость запроса — его размер в токенах. Поэтому один шумный пользователь
+получает свою долю, а не всю пропускную способность. Если очередь длиннее
+``GPT_QUEUE_MAX``, запрос сразу отклоняется с ``SchedulerBusy``.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable, Optional
+
+from src.core.config import config
+from src.utils.percentile import percentile
+
+# сколько последних ожиданий учитывать в статистике
+_WAIT_WINDOW = 500
+
+
+class SchedulerBusy(Exception):
+    """Raised when the provider queue is already at ``GPT_QUEUE_MAX``."""
+
+
+class _Lane:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.vtime = 0.0  # стартовая метка последнего выданного запроса
+        self.finish: dict[Hashable, float] = {}  # поток -> где закончится его последний запрос
+        self.heap: list[tuple[float, int, asyncio.Future]] = []
+        self.waits: deque[float] = deque(maxlen=_WAIT_WINDOW)
+        self.granted = 0
+        self.rejected = 0
+
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self.heap if not fut.done())
+
+    def tag(self, flow: Hashable, cost: float) -> float:
+        start = max(self.vtime, self.finish.get(flow, 0.0))
+        self.finish[flow] = start + cost
+        if len(self.finish) > 10000:
+            # потоки, чья очередь уже прошла, больше ничего не меняют
+            self.finish = {f: t for f, t in self.finish.items() if t > self.vtime}
+        return start
+
+    def wake_next(self) -> None:
+        while self.heap and self.active < self.limit:
+            start, _, fut = heapq.heappop(self.heap)
+            if fut.done():
+                continue  # ожидавший ушёл по отмене
+            self.active += 1
+            self.vtime = start
+            fut.set_result(None)
+
+
+class Scheduler:
+    """Per-provider concurrency slots handed out fairly across flows."""
+
+    def __init__(self, limits: dict[str, int], max_queue: int):
+        self.max_queue = max_queue
+        self._lanes = {provider: _Lane(limit) for provider, limit in limits.items()}
+        self._seq = itertools.count()
+
+    @asynccontextmanager
+    async def slot(self, provider: str, flow: Hashable, cost: float) -> AsyncIterator[float]:
+        """Hold one of ``provider``'s slots; yields seconds spent waiting for it."""
+        lane = self._lanes[provider]
+        t0 = time.monotonic()
+        if lane.active < lane.limit and not lane.queued():
+            lane.active += 1
+            lane.vtime = lane.tag(flow, cost)
+        else:
+            if lane.queued() >= self.max_queue:
+                lane.rejected += 1
+                raise SchedulerBusy(provider)
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(lane.heap, (lane.tag(flow, cost), next(self._seq), fut))
+            try:
+                await fut
+            except asyncio.CancelledError:
+                if fut.done() and not fut.cancelled():
+                    # слот выдали одновременно с отменой — вернём его
+                    lane.active -= 1
+                    lane.wake_next()
+                raise
+        waited = time.monotonic() - t0
+        lane.granted += 1
+        lane.waits.append(waited)
+        try:
+            yield waited
+        finally:
+            lane.active -= 1
+            lane.wake_next()
+
+    def stats(self) -> dict:
+        result = {}
+        for provider, lane in self._lanes.items():
+            waits = sorted(lane.waits)
+            result[provider] = {
+                "limit": lane.limit,
+                "active": lane.active,
+                "queued": lane.queued(),
+                "granted": lane.granted,
+                "rejected": lane.rejected,
+                "wait_p50": _rounded(percentile(waits, 50)),
+                "wait_p95": _rounded(percentile(waits, 95)),
+                "wait_max": round(waits[-1], 3) if waits else None,
+            }
+        return result
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+scheduler = Scheduler(
+    limits={"groq": config.GPT_CONCURRENCY_GROQ, "openai": config.GPT_CONCURRENCY_OPENAI},
+    max_queue=config.GPT_QUEUE_MAX,
+)
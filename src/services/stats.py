@@ -0,0 +1,48 @@
+"""Сбор и периодический вывод счётчиков в лог."""
+
+import json
+import logging
+from typing import Callable
+
+from telegram.ext import ContextTypes, JobQueue
+
+from src.core.config import config
+
+_JOB_NAME = "log_stats"
+_providers: dict[str, Callable[[], dict]] = {}
+
+
+def register(name: str, provider: Callable[[], dict]) -> None:
+    """Register a callable returning a dict of counters under ``name``."""
+    _providers[name] = provider
+
+
+def snapshot() -> dict:
+    """Collect counters from all registered providers."""
+    result: dict = {}
+    for name, provider in _providers.items():
+        try:
+            result[name] = provider()
+        except Exception as e:
+            logging.warning("stats provider %s failed: %s", name, e)
+    return result
+
+
+def log_snapshot() -> None:
+    logging.info("stats %s", json.dumps(snapshot(), ensure_ascii=False, default=str))
+
+
+async def _log_stats_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    log_snapshot()
+
+
+def schedule(job_queue: JobQueue | None) -> None:
+    """Log counters every ``STATS_LOG_INTERVAL`` seconds."""
+    if not job_queue or config.STATS_LOG_INTERVAL <= 0:
+        return
+    job_queue.run_repeating(
+        _log_stats_job,
+        interval=config.STATS_LOG_INTERVAL,
+        first=config.STATS_LOG_INTERVAL,
+        name=_JOB_NAME,
+    )
@@ -0,0 +1,137 @@
+"""Потоковый ответ: заглушка в чате, которую дописываем по мере генерации."""
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from telegram import Message
+from telegram.error import BadRequest, RetryAfter
+
+from src.utils.format import as_html
+
+PLACEHOLDER = "…"
+# сколько раз ждать RetryAfter для запросов, которые нельзя пропустить
+_FINAL_ATTEMPTS = 3
+
+T = TypeVar("T")
+
+
+def _retry_delay(e: RetryAfter) -> float:
+    delay = e.retry_after
+    return delay.total_seconds() if hasattr(delay, "total_seconds") else float(delay)
+
+
+async def _deliver(call: Callable[[], Awaitable[T]]) -> T:
+    """Run a request that must reach the user, waiting out flood control."""
+    for attempt in range(_FINAL_ATTEMPTS):
+        try:
+            return await call()
+        except RetryAfter as e:
+            if attempt == _FINAL_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(_retry_delay(e))
+
+
+def _split_point(text: str, limit: int) -> int:
+    """Where to cut ``text`` so the head fits ``limit``: last newline, then space."""
+    for sep in ("\n", " "):
+        pos = text.rfind(sep, 0, limit)
+        if pos > limit // 2:
+            return pos + 1
+    return limit
+
+
+class StreamingReply:
+    """Reply to ``message`` and edit it with accumulated text at most every ``interval`` seconds.
+
+    When the text grows past ``limit`` characters the current message is
+    finalized and the rest continues in a new one.
+    """
+
+    def __init__(self, message: Message, interval: float, limit: int):
+        self._source = message
+        self._interval = interval
+        self._limit = limit
+        self._current: Message | None = None
+        self._text = ""  # текст текущего сообщения
+        self._shown = ""  # что уже отображено в текущем сообщении
+        self._last_edit = 0.0
+        self._parts: list[str] = []  # завершённые сообщения
+        self.started_at = time.monotonic()
+        self.first_token_at: float | None = None
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts) + self._text
+
+    @property
+    def time_to_first_token(self) -> float:
+        """Seconds from ``start`` to the first delta (-1 if none arrived)."""
+        if self.first_token_at is None:
+            return -1.0
+        return self.first_token_at - self.started_at
+
+    async def start(self) -> None:
+        self.started_at = time.monotonic()
+        self._current = await self._source.reply_text(PLACEHOLDER)
+        self._last_edit = time.monotonic()
+
+    async def feed(self, delta: str) -> None:
+        if not delta:
+            return
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+        self._text += delta
+        while len(self._text) > self._limit:
+            cut = _split_point(self._text, self._limit)
+            head, self._text = self._text[:cut], self._text[cut:]
+            await self._finalize(head)
+            self._parts.append(head)
+            self._current = await _deliver(
+                lambda: self._source.reply_text(self._text or PLACEHOLDER)
+            )
+            self._shown = self._text
+            self._last_edit = time.monotonic()
+        if time.monotonic() - self._last_edit >= self._interval:
+            await self._edit(self._text)
+
+    async def finish(self, fallback: str = "") -> str:
+        """Show the final text (HTML-escaped) and return the whole reply."""
+        if not self.text and fallback:
+            self._text = fallback
+        await self._finalize(self._text)
+        return self.text
+
+    async def _edit(self, text: str) -> None:
+        if not text.strip() or text == self._shown or self._current is None:
+            return
+        self._last_edit = time.monotonic()
+        try:
+            await self._current.edit_text(text)
+            self._shown = text
+        except RetryAfter as e:
+            # Telegram просит реже редактировать — пропускаем промежуточные правки
+            self._last_edit = time.monotonic() + _retry_delay(e)
+        except BadRequest as e:
+            logging.debug("stream edit skipped: %s", e)
+
+    async def _finalize(self, text: str) -> None:
+        if self._current is None or not text.strip():
+            return
+        html = as_html(text)
+        if html == text == self._shown:
+            return
+        message = self._current
+        try:
+            # финальную правку не пропускаем: иначе в чате останется недописанный текст
+            await _deliver(lambda: message.edit_text(html, parse_mode="HTML"))
+            self._shown = text
+        except BadRequest:
+            try:
+                await _deliver(lambda: message.edit_text(text))  # plain-text fallback
+                self._shown = text
+            except Exception as e:
+                logging.warning("stream finalize failed: %s", e)
+        except Exception as e:
+            logging.warning("stream finalize failed: %s", e)
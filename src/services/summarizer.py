@@ -0,0 +1,95 @@
+"""Сжатие старой части диалога в краткое содержание дешёвой моделью Groq.
+
+Работает в фоне после ответа: когда в чате накапливается больше
+``GPT_SUMMARY_KEEP_TURNS + GPT_SUMMARY_EVERY`` реплик, всё, кроме последних
+``GPT_SUMMARY_KEEP_TURNS``, вместе с прежним содержанием отдаётся модели
+``GPT_SUMMARY_MODEL``, а результат заменяет эти реплики в промпте.
+"""
+
+import asyncio
+import logging
+import time
+
+from src.clients.gpt import ask_groq
+from src.core.config import config
+from src.services import llm
+from src.services.dialog_store import dialog_store
+from src.services.scheduler import scheduler
+from src.services.prompt_budget import Turn
+
+SUMMARY_SYSTEM = (
+    "Ты ведёшь краткий конспект переписки. Обнови конспект с учётом новых реплик: "
+    "сохрани факты, имена, договорённости и открытые вопросы, без оценок и приветствий. "
+    "Пиши по-русски, сжато, не больше нескольких предложений."
+)
+
+_running: set[int] = set()
+_tasks: set[asyncio.Task] = set()
+_counters = {"runs": 0, "failed": 0, "turns_compacted": 0, "seconds": 0.0}
+
+
+def enabled() -> bool:
+    return config.GPT_SUMMARIZE and bool(config.GROQ_API_KEY)
+
+
+def _summary_prompt(previous: str, turns: list[Turn]) -> str:
+    lines = [f"Текущий конспект: {previous or '(пусто)'}", "", "Новые реплики:"]
+    lines += [f"{role}: {content}" for role, content, _ in turns]
+    return "\n".join(lines)
+
+
+def maybe_compact(chat_id: int) -> None:
+    """Start background compaction of ``chat_id`` if it has grown enough."""
+    if not enabled() or chat_id in _running:
+        return
+    keep = config.GPT_SUMMARY_KEEP_TURNS
+    # не ждём дольше, чем помещается в deque, иначе старое уйдёт без конспекта
+    threshold = min(keep + config.GPT_SUMMARY_EVERY, dialog_store.turns_per_chat)
+    turns = dialog_store.older_than(chat_id, keep)
+    if not turns or len(turns) + keep < threshold:
+        return
+    _running.add(chat_id)
+    task = asyncio.ensure_future(_compact(chat_id, turns))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _compact(chat_id: int, turns: list[Turn]) -> None:
+    t0 = time.monotonic()
+    try:
+        prompt = _summary_prompt(dialog_store.summary(chat_id), turns)
+        messages = [{"role": "user", "content": prompt}]
+        cost = llm.request_cost(messages, config.GPT_SUMMARY_MAX_TOKENS)
+        # сжатие — отдельный поток чата в общей очереди Groq, наравне с ответами
+        async with scheduler.slot("groq", (chat_id, None), cost):
+            summary = await ask_groq(
+                api_token=config.GROQ_API_KEY,
+                model=config.GPT_SUMMARY_MODEL,
+                system=SUMMARY_SYSTEM,
+                messages=messages,
+                max_tokens=config.GPT_SUMMARY_MAX_TOKENS,
+            )
+        if not summary.strip():
+            _counters["failed"] += 1
+            return
+        if dialog_store.compact(chat_id, turns, summary.strip()):
+            _counters["runs"] += 1
+            _counters["turns_compacted"] += len(turns)
+    except Exception as e:
+        _counters["failed"] += 1
+        logging.warning("summary failed chat=%s: %s", chat_id, e)
+    finally:
+        _counters["seconds"] += time.monotonic() - t0
+        _running.discard(chat_id)
+
+
+async def aclose() -> None:
+    """Cancel running compactions; called before the final dialog flush."""
+    for task in list(_tasks):
+        task.cancel()
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
+
+
+def stats() -> dict:
+    return {**_counters, "seconds": round(_counters["seconds"], 2), "running": len(_running)}
@@ -0,0 +1,144 @@
+"""Локальный индекс названий фильмов из ежедневной выгрузки TMDb.
+
+Выгрузка ``movie_ids_MM_DD_YYYY.json.gz`` — gzip JSONL со строками вида
+``{"id": 157336, "original_title": "Interstellar", "popularity": 41.2, ...}``.
+
+Сборка индекса::
+
+    python -m src.services.title_index movie_ids_10_16_2026.json.gz tmdb_titles.sqlite
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import re
+import sqlite3
+import unicodedata
+from typing import Iterable, Iterator, Optional
+
+_QUOTES_RE = re.compile(r"[\"'‘’«»“”„:;!?.,]")
+_SPACES_RE = re.compile(r"\s+")
+
+
+def normalize(title: str) -> str:
+    """Normalize a title for exact lookups: case, accents, dashes and punctuation."""
+    text = (title or "").lower().replace("-", " ").replace("ё", "е").replace("й", "\0")
+    # «Amélie» и «Amelie» — одно название; й сохраняем, иначе совпадёт с и
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = unicodedata.normalize("NFC", text).replace("\0", "й")
+    text = _QUOTES_RE.sub("", text)
+    return _SPACES_RE.sub(" ", text).strip()
+
+
+def _read_export(path: str) -> Iterator[tuple[str, int, float]]:
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if row.get("adult") or row.get("video"):
+                continue
+            norm = normalize(row.get("original_title") or "")
+            movie_id = row.get("id")
+            if norm and isinstance(movie_id, int):
+                yield norm, movie_id, float(row.get("popularity") or 0.0)
+
+
+def build(export_path: str, index_path: str) -> int:
+    """Build the index file from a TMDb export and return the number of titles."""
+    tmp_path = index_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # WITHOUT ROWID: таблица хранится упорядоченной по norm — поиск по ключу без отдельного индекса
+        conn.execute(
+            """
+            CREATE TABLE titles (
+                norm TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                popularity REAL NOT NULL,
+                PRIMARY KEY (norm, id)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO titles (norm, id, popularity) VALUES (?, ?, ?)",
+            _read_export(export_path),
+        )
+        count = conn.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    os.replace(tmp_path, index_path)
+    return count
+
+
+class TitleIndex:
+    """Read-only lookup of TMDb ids by normalized original title."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self._conn is None:
+            if not os.path.exists(self.path):
+                return None
+            # индекс только читаем; запрос по первичному ключу занимает доли миллисекунды
+            self._conn = sqlite3.connect(
+                f"file:{self.path}?mode=ro", uri=True, check_same_thread=False
+            )
+        return self._conn
+
+    def lookup(self, title: str, limit: int = 5) -> list[int]:
+        """Return ids with exactly this normalized title, most popular first."""
+        norm = normalize(title)
+        conn = self._connect()
+        ids: list[int] = []
+        if conn is not None and norm:
+            try:
+                rows = conn.execute(
+                    "SELECT id FROM titles WHERE norm = ? ORDER BY popularity DESC LIMIT ?",
+                    (norm, limit),
+                ).fetchall()
+                ids = [r[0] for r in rows]
+            except sqlite3.Error as e:
+                logging.warning("title index lookup failed: %s", e)
+        if ids:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return ids
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def _main(argv: Iterable[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Build local TMDb title index")
+    parser.add_argument("export", help="path to movie_ids_*.json.gz")
+    parser.add_argument("index", nargs="?", default="tmdb_titles.sqlite", help="output file")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    count = build(args.export, args.index)
+    logging.info("title index built: %s titles -> %s", count, args.index)
+
+
+if __name__ == "__main__":
+    _main()
@@ -0,0 +1,86 @@
+"""Параллельная обработка апдейтов с сохранением порядка внутри чата.
+
+Апдейты разных чатов обрабатываются одновременно, не больше
+``UPDATE_CONCURRENCY`` штук сразу, поэтому медленная загрузка из Instagram
+в одном чате не задерживает ``/add`` и ``/list`` в другом. Апдейты одного
+чата идут строго по очереди, в порядке поступления. Апдейты без чата
+(например, inline-запросы) порядка не требуют и занимают только общий слот.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Hashable, Optional
+
+from telegram.ext import BaseUpdateProcessor
+
+from src.core.config import config
+from src.utils.keyed_lock import KeyedLock
+
+# Предел PTB здесь только страховка: задачи на апдейты приложение уже создало,
+# а настоящий лимит берётся после замка чата, чтобы ждущие своей очереди
+# апдейты одного чата не занимали слоты остальных.
+_MAX_PENDING = 10000
+
+
+def _chat_key(update: object) -> Optional[Hashable]:
+    chat = getattr(update, "effective_chat", None)
+    return chat.id if chat is not None else None
+
+
+class ChatOrderedProcessor(BaseUpdateProcessor):
+    """Process updates concurrently, one at a time per chat."""
+
+    def __init__(self, max_concurrent: int):
+        super().__init__(_MAX_PENDING)
+        self.limit = max(max_concurrent, 1)
+        self._slots = asyncio.Semaphore(self.limit)
+        self._chats = KeyedLock()
+        self.in_flight = 0
+        self.peak = 0
+        self.processed = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        try:
+            await self._ordered(_chat_key(update), coroutine)
+        except asyncio.CancelledError:
+            if asyncio.iscoroutine(coroutine):
+                coroutine.close()  # отменён в очереди: не оставляем неначатую корутину
+            raise
+
+    async def _ordered(self, key: Optional[Hashable], coroutine: Awaitable[Any]) -> None:
+        if key is None:
+            await self._run(coroutine)
+            return
+        # задачи на апдейты стартуют в порядке поступления, а KeyedLock выдаёт
+        # замок в порядке вызовов hold — так сохраняется порядок внутри чата
+        async with self._chats.hold(key):
+            await self._run(coroutine)
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._slots:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            try:
+                await coroutine
+            finally:
+                self.in_flight -= 1
+                self.processed += 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "peak": self.peak,
+            # принятые, но ещё не начатые: ждут свой чат или свободный слот
+            "waiting": self.current_concurrent_updates - self.in_flight,
+            "busy_chats": len(self._chats),
+            "processed": self.processed,
+        }
+
+
+update_processor = ChatOrderedProcessor(config.UPDATE_CONCURRENCY)
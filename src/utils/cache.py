@@ -0,0 +1,65 @@
+"""In-memory caches with counters."""
+
+from typing import Any, Callable, Optional
+
+from cachetools import TTLCache
+
+_MISSING = object()
+
+
+class MeteredTTLCache(TTLCache):
+    """LRU + TTL cache that counts hits, misses, evictions and expirations.
+
+    With ``getsizeof`` the ``maxsize`` becomes a ceiling on the summed item
+    sizes (e.g. bytes) instead of the number of entries.
+    """
+
+    def __init__(
+        self,
+        maxsize: float,
+        ttl: float,
+        getsizeof: Optional[Callable[[Any], float]] = None,
+    ):
+        super().__init__(maxsize, ttl, getsizeof=getsizeof)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def lookup(self, key: Any, default: Any = None) -> Any:
+        """Like ``get`` but updates hit/miss counters."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def store(self, key: Any, value: Any) -> bool:
+        """Put ``value`` unless it alone exceeds the cache ceiling."""
+        if self.getsizeof(value) > self.maxsize:
+            return False
+        self[key] = value
+        return True
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        if expired:
+            self.expirations += len(expired)
+        return expired
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self),
+            "currsize": self.currsize,
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
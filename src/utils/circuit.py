@@ -0,0 +1,72 @@
+"""Circuit breaker for a flaky backend."""
+
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Open after ``threshold`` consecutive failures, probe again after ``reset_after`` seconds.
+
+    While open every call is refused at once. Once ``reset_after`` has passed
+    the breaker lets a single probe through (half-open): success closes it,
+    failure opens it for another ``reset_after``. ``threshold=0`` disables it.
+    """
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.refused = 0
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be refused (open and not yet due for a probe)."""
+        if self.state == OPEN:
+            return time.monotonic() - self._opened_at < self.reset_after
+        return self.state == HALF_OPEN and self._probing
+
+    def allow(self) -> bool:
+        """Whether a call may go through now; a granted half-open call is the probe."""
+        if self.threshold <= 0 or self.state == CLOSED:
+            return True
+        if self.is_open:
+            self.refused += 1
+            return False
+        self.state = HALF_OPEN
+        self._probing = True
+        return True
+
+    def record(self, ok: bool) -> None:
+        """Report the outcome of an allowed call."""
+        self._probing = False
+        if ok:
+            self.state = CLOSED
+            self._failures = 0
+            return
+        self._failures += 1
+        if self.state == HALF_OPEN or (
+            self.threshold > 0 and self._failures >= self.threshold
+        ):
+            if self.state != OPEN:
+                self.opened += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Forget an allowed call that ended without a verdict (e.g. cancelled)."""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "opened": self.opened,
+            "refused": self.refused,
+        }
@@ -0,0 +1,36 @@
+"""Per-key asyncio locks that are dropped once unused."""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+
+
+class KeyedLock:
+    """One ``asyncio.Lock`` per key, held in FIFO order of ``hold`` calls.
+
+    Registration and the acquire attempt happen before the first suspension,
+    so callers started in some order get the lock in that order. A key's lock
+    is forgotten when nobody holds or waits for it.
+    """
+
+    def __init__(self) -> None:
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self._users: dict[Hashable, int] = {}  # ключ -> ждущих или держащих замок
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._users[key] = self._users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[key] -= 1
+            if not self._users[key]:
+                # замок больше никому не нужен — не копим их по всем ключам
+                del self._users[key]
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        """Keys currently held or waited for."""
+        return len(self._users)
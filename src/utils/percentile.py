@@ -0,0 +1,11 @@
+"""Nearest-rank percentile over a sorted sample."""
+
+from typing import Optional, Sequence
+
+
+def percentile(ordered: Sequence[float], p: float) -> Optional[float]:
+    """``p``-th percentile of ``ordered`` (ascending), None if it is empty."""
+    if not ordered:
+        return None
+    idx = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[idx]
@@ -0,0 +1,89 @@
+"""Connection pool metrics from public httpx/httpcore hooks."""
+
+from typing import AsyncIterator, Callable
+
+import httpx
+
+
+class _ClosingStream(httpx.AsyncByteStream):
+    def __init__(self, inner: httpx.AsyncByteStream, on_close: Callable[[], None]):
+        self._inner = inner
+        self._on_close = on_close
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._inner:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._inner.aclose()
+        finally:
+            self._on_close()
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """Wrap a transport and count requests waiting for a connection or in flight.
+
+    A request is waiting until httpcore reports (through the documented
+    ``trace`` extension) that it started sending headers on a connection, and
+    in flight until its response stream is closed. New TCP connections are
+    counted the same way, so ``connects`` against ``requests`` shows reuse.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self._inner = inner
+        self.requests = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.connects = 0
+        self.http2 = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.waiting += 1
+        state = {"waiting": True, "done": False}
+        outer_trace = request.extensions.get("trace")
+
+        def started() -> None:
+            if state["waiting"]:
+                state["waiting"] = False
+                self.waiting -= 1
+
+        def done() -> None:
+            if not state["done"]:
+                state["done"] = True
+                started()
+                self.in_flight -= 1
+
+        async def trace(event: str, info: dict) -> None:
+            if event == "connection.connect_tcp.complete":
+                self.connects += 1
+            elif event.endswith(".send_request_headers.started"):
+                started()
+            if outer_trace is not None:
+                await outer_trace(event, info)
+
+        request.extensions["trace"] = trace
+        try:
+            response = await self._inner.handle_async_request(request)
+        except BaseException:
+            done()
+            raise
+        started()
+        if response.extensions.get("http_version") == b"HTTP/2":
+            self.http2 += 1
+        response.stream = _ClosingStream(response.stream, done)
+        return response
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "connects": self.connects,
+            "http2": self.http2,
+        }
@@ -0,0 +1,117 @@
+"""Retries bounded by one absolute deadline."""
+
+import asyncio
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Retry:
+    """Verdict of a classifier: retry the failed attempt.
+
+    ``after`` overrides the backoff (e.g. a server ``Retry-After``);
+    ``counts=False`` keeps the attempt from using up ``attempts``.
+    """
+
+    after: Optional[float] = None
+    counts: bool = True
+
+
+Classifier = Callable[[BaseException], Optional[Retry]]
+
+
+class RetryPolicy:
+    """Run an operation until it succeeds, fails for good or runs out of time.
+
+    Every attempt gets the time left until the deadline as its timeout (and
+    at most ``attempt_timeout``), so a late attempt is never cut short by an
+    outer ``wait_for`` and backoff sleeps that would cross the deadline are
+    not taken. ``classify`` decides per client which errors are worth
+    retrying; anything it returns None for is raised at once.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        attempts: int,
+        base_delay: float,
+        max_delay: float,
+        classify: Classifier,
+        attempt_timeout: Optional[float] = None,
+    ):
+        self.name = name
+        self.attempts = max(attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.classify = classify
+        self.attempt_timeout = attempt_timeout
+        self.calls = 0
+        self.retries = 0
+        self.gave_up = 0
+        self.deadline_hits = 0
+        self._per_call: Counter[int] = Counter()  # попыток на запрос -> сколько запросов
+
+    def _backoff(self, failures: int) -> float:
+        # full jitter: одновременные клиенты не повторяют запросы синхронно
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**failures))
+
+    async def run(
+        self,
+        fn: Callable[[float], Awaitable[T]],
+        timeout: float,
+        attempts: Optional[int] = None,
+    ) -> T:
+        """Call ``fn(attempt_timeout)`` until success; all of it within ``timeout`` seconds."""
+        attempts = max(attempts or self.attempts, 1)
+        self.calls += 1
+        deadline = time.monotonic() + timeout
+        counted = 0
+        made = 0
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.deadline_hits += 1
+                    raise asyncio.TimeoutError(f"{self.name}: deadline exceeded")
+                budget = min(remaining, self.attempt_timeout or remaining)
+                made += 1
+                try:
+                    return await asyncio.wait_for(fn(budget), budget)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    verdict = self.classify(e)
+                    if verdict is None:
+                        raise
+                    if verdict.counts:
+                        counted += 1
+                    if counted >= attempts:
+                        self.gave_up += 1
+                        raise
+                    delay = (
+                        verdict.after
+                        if verdict.after is not None
+                        else self._backoff(max(counted - 1, 0))
+                    )
+                    if time.monotonic() + delay >= deadline:
+                        self.deadline_hits += 1
+                        raise
+                    self.retries += 1
+                    await asyncio.sleep(delay)
+        finally:
+            self._per_call[made] += 1
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "gave_up": self.gave_up,
+            "deadline": self.deadline_hits,
+            "attempts": dict(sorted(self._per_call.items())),
+        }
@@ -0,0 +1,51 @@
+from pathlib import Path
+
+import pytest
+
+from src.services import title_index
+
+FIXTURE = Path(__file__).parent / "fixtures" / "movie_ids_sample.json.gz"
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "titles.sqlite"
+    # битая строка и video-запись в выгрузке пропускаются
+    assert title_index.build(str(FIXTURE), str(path)) == 6
+    idx = title_index.TitleIndex(str(path))
+    yield idx
+    idx.close()
+
+
+def test_lookup_exact_title(index):
+    assert index.lookup("Interstellar") == [157336]
+
+
+def test_lookup_orders_by_popularity(index):
+    assert index.lookup("the matrix") == [603, 1000001]
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "le fabuleux destin d'amelie poulain",
+        "LE FABULEUX DESTIN D'AMÉLIE POULAIN",
+        "Le Fabuleux  Destin d’Amélie Poulain",
+    ],
+)
+def test_lookup_ignores_case_accents_and_punctuation(index, query):
+    assert index.lookup(query) == [194]
+
+
+def test_lookup_cyrillic(index):
+    assert index.lookup("ирония судьбы или с легким паром") == [20992]
+
+
+def test_missing_title(index):
+    assert index.lookup("No Such Movie") == []
+    assert index.stats()["misses"] == 1
+
+
+def test_missing_index_file(tmp_path):
+    idx = title_index.TitleIndex(str(tmp_path / "absent.sqlite"))
+    assert idx.lookup("Interstellar") == []